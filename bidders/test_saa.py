@@ -3,11 +3,16 @@
 import json
 from flask import Flask, request
 import logging
+import os
 import random
+import sys
 from threading import Thread
 import time
 import urllib.request
 from multiprocessing import Lock
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.model import Bidder, GoodType
+from core.saa import SAAuction
 
 LOGGING_LEVEL = logging.INFO
 NB_TESTS = 10
@@ -168,29 +173,14 @@ def create_competition(nb_bidders, nb_goods, max_value, start_price, increment,
 
 def predict_winners(auction, values):
     global sold_prices, winners
-    last_prices = [
-        [auction["increment"] * ((value - auction["start_price"]) // auction["increment"])
-         + auction["start_price"]
-         for value in row]
-        for row in values
-    ]
-    nb_goods = len(values[0])
-    nb_bidders = len(values)
-    first_prices = [0] * nb_goods
-    second_prices = [0] * nb_goods
-    winners = [None] * nb_goods
-    for good in range(nb_goods):
-        for bidder in range(nb_bidders):
-            if last_prices[bidder][good] >= first_prices[good]:
-                second_prices[good] = first_prices[good]
-                first_prices[good] = last_prices[bidder][good]
-                winners[good] = bidder
-            elif last_prices[bidder][good] > second_prices[good]:
-                second_prices[good] = last_prices[bidder][good]
-    sold_prices = [
-        0 if first_prices[good] == second_prices[good]
-        else second_prices[good] + auction["increment"]
-        for good in range(nb_goods)]
+    saa = SAAuction([Bidder(agent['id']) for agent in auction['agents']],
+                    [GoodType(good) for good in auction['goods']],
+                    auction['start_price'], auction['increment'])
+    propositions = saa.solve_truthful(values)['propositions']
+    sold_prices = [0 if price is None else price for price in propositions['sold_prices']]
+    winners = [None] * len(auction['goods'])
+    for bidder, good, _ in saa.trades.items():
+        winners[good] = bidder
 
 
 def check_result(auction_state):
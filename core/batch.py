@@ -0,0 +1,210 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.model import Bidder, GoodType, array_joint_trade
+
+
+class BatchAuction:
+    """
+This class represents a batch of K independent auctions sharing the same
+bidders and goods, whose states are stored in stacked NumPy arrays so that
+all of them can be advanced at once (e.g. for Monte Carlo simulations).
+Must be extended to describe precise auctions.
+    """
+    def __init__(self, name: str, k: int, bidders: list[Bidder], goods: list[GoodType],
+                 start_price, increment):
+        """
+        Creates k auctions. start_price and increment can either be scalars
+        (shared by all the instances) or vectors of size k.
+        """
+        self.name = name
+        self.k = k
+        self.bidders = bidders
+        self.bidder_idx = {bidder.name: idx for idx, bidder in enumerate(bidders)}
+        self.goods = goods
+        self.good_idx = {good.name: idx for idx, good in enumerate(goods)}
+        self.n = len(bidders)
+        self.m = len(goods)
+        price_type = np.result_type(np.asarray(start_price), np.asarray(increment))
+        self.start_price = np.broadcast_to(start_price, (k,)).astype(price_type)
+        self.increment = np.broadcast_to(increment, (k,)).astype(price_type)
+        self.price = self.start_price.copy()
+        self.trades = np.zeros((k, self.n, self.m), dtype=np.int8)
+        self.payments = np.zeros((k, self.n), dtype=price_type)
+        self.sold_prices = np.zeros((k, self.m), dtype=price_type)
+        self.bids = np.zeros((k, self.n, self.m), dtype=bool)
+        self.sold = np.zeros((k, self.m), dtype=bool)
+        self.terminated = np.zeros(k, dtype=bool)
+
+    def does(self, instance, bidder, action):
+        """
+        Executes the given action for the given bidder in the given instance.
+        As in the scalar auctions, an action is a good, a list of goods or 'noop'.
+        """
+        if action != 'noop':
+            bidder = self.get_bidder_idx(bidder)
+            goods = action
+            if type(goods) != list:
+                goods = [goods]
+            goods = [self.get_good_idx(good) for good in goods]
+            self.bids[instance, bidder, goods] = True
+
+    def is_legal(self, instance, action):
+        """
+        Evaluates whether the given action (a pair (bidder, good) or
+        (bidder, list of goods)) is legal in the given instance.
+        """
+        bidder, goods = action
+        bidder = self.get_bidder_idx(bidder)
+        if type(goods) != list:
+            goods = [goods]
+        goods = [self.get_good_idx(good) for good in goods]
+        return bidder >= 0 and bidder < len(self.bidders) \
+            and all(good >= 0 and good < len(self.goods) for good in goods) \
+            and not self.is_terminated(instance) \
+            and all(not self.sold[instance, good] for good in goods)
+
+    def bid(self, bids):
+        """
+        Registers the bids of every bidder in every instance at once.
+        bids is a k × bidders × goods boolean array. Bids for sold goods or
+        in terminated instances are ignored.
+        """
+        self.bids |= bids & ~self.sold[:, None, :] & ~self.terminated[:, None, None]
+
+    def truthful_bids(self, values):
+        """
+        Returns the bids of truthful bidders, i.e. bidders bidding for every
+        unsold good they value at least the current price.
+        values is a k × bidders × goods (or bidders × goods) array.
+        """
+        return (values >= self.price[:, None, None]) & ~self.sold[:, None, :]
+
+    def next(self):
+        """
+        Computes the next state of every instance that is not terminated yet.
+        Should be defined in subclasses.
+        """
+        raise NotImplementedError
+
+    def is_terminated(self, instance=None):
+        """
+        Returns True if and only if the given instance (or all the instances
+        if none is given) is in its terminal state.
+        """
+        if instance is None:
+            return bool(self.terminated.all())
+        return bool(self.terminated[instance])
+
+    def _sell(self, instances, goods, winners):
+        """
+        Sells the given goods of the given instances to the given winners
+        (three index arrays of the same size) at the current price.
+        """
+        self.trades[instances, winners, goods] = 1
+        self.sold[instances, goods] = True
+        self.sold_prices[instances, goods] = self.price[instances]
+        np.add.at(self.payments, (instances, winners), self.price[instances])
+
+    def state(self, instance):
+        """
+        Returns a JSON representation of the state of the given instance,
+        identical to the one of the corresponding scalar auction.
+        """
+        auction_state = {}
+        auction_state["joint_trade"] = array_joint_trade(self.bidders, self.goods,
+                                                         self.trades[instance])
+        auction_state["joint_allocation"] = auction_state["joint_trade"]
+        payments = self.payments[instance].tolist()
+        auction_state["joint_payment"] = {
+            str(bidder): payments[i]
+            for i, bidder in enumerate(self.bidders)
+            if payments[i]
+            }
+        sold = self.sold[instance].tolist()
+        auction_state["propositions"] = {
+            "terminated": bool(self.terminated[instance]),
+            "price": self.price[instance].item(),
+            "start_price": self.start_price[instance].item(),
+            "increment": self.increment[instance].item(),
+            "sold_prices": [price if sold[j] else None
+                            for j, price in enumerate(self.sold_prices[instance].tolist())],
+            "sold": sold
+            }
+        return auction_state
+
+    def states(self):
+        """
+        Returns the list of the states of all the instances.
+        """
+        return [self.state(instance) for instance in range(self.k)]
+
+    def get_bidder_idx(self, bidder):
+        """
+        Gets the agent index given the agent id.
+        """
+        bidder = bidder.name if type(bidder) == Bidder else bidder
+        return self.bidder_idx[bidder]
+
+    def get_good_idx(self, good):
+        """
+        Gets the good index given the good id.
+        """
+        good = good.name if type(good) == GoodType else good
+        return self.good_idx[good]
+
+    def __str__(self):
+        return f'{self.k} × {self.name} <[{", ".join(str(bidder) for bidder in self.bidders)}], ' + \
+            f'[{", ".join(str(good) for good in self.goods)}]>'
+
+
+class BatchSAAuction(BatchAuction):
+    """
+This class represents a batch of simultaneous ascending auctions
+(see `core.saa.SAAuction`) advanced in lock-step.
+    """
+    def __init__(self, k: int, bidders: list[Bidder], goods: list[GoodType], start_price, increment):
+        super().__init__("Simultaneous Ascending Auction", k, bidders, goods,
+                         start_price, increment)
+
+    def next(self):
+        """
+        Computes the next state of every running instance. In each instance,
+        a good is sold as soon as exactly one bidder bids for it.
+        """
+        running = ~self.terminated
+        nb_bids = np.count_nonzero(self.bids, axis=1)
+        nb_bids[self.sold | self.terminated[:, None]] = 0
+        instances, goods = np.nonzero(nb_bids == 1)
+        if goods.size:
+            self._sell(instances, goods, self.bids[instances, :, goods].argmax(axis=1))
+        self.bids[:] = False
+        self.terminated |= running & (~nb_bids.any(axis=1) | self.sold.all(axis=1))
+        self.price[running] += self.increment[running]
+
+
+class BatchSDAuction(BatchAuction):
+    """
+This class represents a batch of simultaneous descending auctions
+(see `core.sda.SDAuction`) advanced in lock-step.
+    """
+    def __init__(self, k: int, bidders: list[Bidder], goods: list[GoodType], start_price, increment):
+        super().__init__("Simultaneous Descending Auction", k, bidders, goods,
+                         start_price, increment)
+
+    def next(self):
+        """
+        Computes the next state of every running instance. In each instance,
+        a good is sold to the first bidder (lowest index) bidding for it.
+        """
+        running = ~self.terminated
+        has_bids = self.bids.any(axis=1) & ~self.sold & running[:, None]
+        instances, goods = np.nonzero(has_bids)
+        if goods.size:
+            self._sell(instances, goods, self.bids[instances, :, goods].argmax(axis=1))
+        self.bids[:] = False
+        can_decrease = self.price + self.increment >= 1
+        self.terminated |= running & (self.sold.all(axis=1) | ~can_decrease)
+        self.price[running & can_decrease] += self.increment[running & can_decrease]
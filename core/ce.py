@@ -1,12 +1,26 @@
 from typing import Dict, List, Tuple
 import pulp
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from typing import TypeVar, Type
 
+import hashlib
+import json
+import multiprocessing
 import os
 import os.path
+import queue
+import signal
 import sys
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from core.model import Auction, GoodType, Bidder
+from core.model import Auction, GoodType, Bidder, SparseTrades
+from core.snapshot import SnapshotReader, SnapshotWriter
+from core.wdp import ExchangeWDP
 
 # The following type variable is intended to give a type
 # annotation to a class method of Bid
@@ -14,8 +28,6 @@ T = TypeVar('T', bound='Bid')
 
 class Bid:
     def __init__(self, value) -> None:
-        self.sat = pulp.LpVariable(f'sat_{Bid.var_number}', 0, 1, pulp.LpInteger)
-        Bid.var_number += 1
         self.value = value
 
     def as_dict(self) -> Dict:
@@ -35,16 +47,6 @@ class Bid:
     def __str__(self, prefix: str = None) -> str:
         raise NotImplementedError
     
-    def collect_node_variables(self,
-                               d: Dict[GoodType, Tuple[List[pulp.pulp.LpVariable], List[int]]]) -> None:
-        raise NotImplementedError
-    
-    def collect_ic_constraints(self) -> List:
-        raise NotImplementedError
-    
-    def collect_node_variables_and_values(self,
-                                          l: List[Tuple[pulp.pulp.LpVariable, int]]) -> None:
-        l.append((self.sat, self.value))
 
     @classmethod
     def from_dict(cls: Type[T], d: Dict, goods: Dict) -> T:
@@ -56,8 +58,6 @@ class Bid:
                                    for child_dict in d["child_nodes"]])
         else:
             raise Exception(f"Unknown node type {d['node']}")
-    
-    var_number = 1
 
     def is_seller(self) -> bool:
         raise NotImplementedError
@@ -65,6 +65,29 @@ class Bid:
     def is_buyer(self) -> bool:
         raise NotImplementedError
 
+    def normalized(self) -> 'Bid':
+        """
+        Returns a bid tree equivalent to this one for the Winner Determination
+        problem (same optimal welfare), with as many nodes or fewer, or None if
+        the bid can never be satisfied (see `IntervalChoose.normalized`).
+        """
+        raise NotImplementedError
+
+    def is_dominated(self) -> bool:
+        """
+        Returns True if and only if satisfying the bid can never increase
+        the welfare: no node has a positive value and no leaf sells anything,
+        so that not satisfying it is always at least as good.
+        """
+        raise NotImplementedError
+
+    def key(self) -> Tuple:
+        """
+        Returns a hashable representation of the bid tree, equal for equal
+        trees.
+        """
+        raise NotImplementedError
+
 
 class Leaf(Bid):
     """
@@ -95,22 +118,20 @@ This class represents a leaf of the bid tree expressed in TBBL.
             f"{abs(self.quantity)} unit(s) of {self.good} for € {abs(self.value)}"
         )        
 
-    def collect_node_variables(self,
-                               d: Dict[GoodType, Tuple[List[pulp.pulp.LpVariable], List[int]]]) -> None:
-        if self.good not in d:
-            d[self.good] = ([], [])
-        vars, quantities = d[self.good]
-        vars.append(self.sat)
-        quantities.append(self.quantity)
-    
-    def collect_ic_constraints(self) -> List:
-        return []
-
     def is_seller(self) -> bool:
         return self.quantity < 0
 
     def is_buyer(self) -> bool:
         return self.quantity > 0
+
+    def normalized(self) -> Bid:
+        return self
+
+    def is_dominated(self) -> bool:
+        return self.value <= 0 and self.quantity >= 0
+
+    def key(self) -> Tuple:
+        return ("leaf", self.quantity, str(self.good), self.value)
         
 
 
@@ -149,32 +170,67 @@ This class represents an internal node of the bid tree expressed in TBBL.
             '\n'.join(node.__str__(f'{prefix} |-- ') for node in self.bids)
         )
 
-    def collect_node_variables(self,
-                               d: Dict[GoodType, Tuple[List[pulp.pulp.LpVariable], List[int]]]) -> None:
-        for bid in self.bids:
-            bid.collect_node_variables(d)
-    
-    def collect_node_variables_and_values(self,
-                                          l: List[Tuple[pulp.pulp.LpVariable, int]]) -> None:
-        super().collect_node_variables_and_values(l)
-        for bid in self.bids:
-            bid.collect_node_variables_and_values(l)
-
-    def collect_ic_constraints(self) -> List:
-        constraints = []
-        child_vars = [node.sat for node in self.bids]
-        constraints.append(pulp.lpSum(child_vars) <= self.ub * self.sat)
-        constraints.append(pulp.lpSum(child_vars) >= self.lb * self.sat)
-        for node in self.bids:
-            constraints += node.collect_ic_constraints()
-        return constraints
-
     def is_seller(self) -> bool:
         return all((bid.is_seller() for bid in self.bids))
 
     def is_buyer(self) -> bool:
         return all((bid.is_buyer() for bid in self.bids))
 
+    def normalized(self) -> Bid:
+        """
+        Returns an equivalent bid tree (see `Bid.normalized`), where the
+        children are normalized and:
+         - children that can never be satisfied are dropped, as well as
+           dominated ones (see `Bid.is_dominated`) if lb is 0;
+         - children worth nothing of the same kind as this node (AND in AND,
+           XOR in XOR, OR in OR) are replaced by their own children;
+         - duplicate children of an XOR node (ub = 1) are merged;
+         - ub is clamped to the number of children.
+        The node can never be satisfied if lb is greater than ub or than the
+        number of children. A node worth nothing with a single child that
+        must be satisfied is replaced by this child.
+        """
+        lb, ub = max(self.lb, 0), self.ub
+        bids = [bid for bid in (bid.normalized() for bid in self.bids)
+                if bid is not None and not (lb == 0 and bid.is_dominated())]
+        if lb > min(ub, len(bids)):
+            return None
+        ub = min(ub, len(bids))
+        is_and, is_xor, is_or = lb == ub == len(bids), ub == 1, ub == len(bids) and lb <= 1
+        flattened = []
+        for bid in bids:
+            if isinstance(bid, IntervalChoose) and bid.value == 0:
+                k = len(bid.bids)
+                if is_and and bid.lb == bid.ub == k:
+                    flattened.extend(bid.bids)
+                    lb, ub = lb + k - 1, ub + k - 1
+                    continue
+                if is_xor and bid.lb == bid.ub == 1:
+                    flattened.extend(bid.bids)
+                    continue
+                if is_or and bid.lb == 1 and bid.ub == k:
+                    flattened.extend(bid.bids)
+                    ub += k - 1
+                    continue
+            flattened.append(bid)
+        if ub == 1:
+            keys = set()
+            bids, flattened = flattened, []
+            for bid in bids:
+                key = bid.key()
+                if key not in keys:
+                    keys.add(key)
+                    flattened.append(bid)
+        if self.value == 0 and lb == 1 and len(flattened) == 1:
+            return flattened[0]
+        return IntervalChoose(lb, ub, self.value, flattened)
+
+    def is_dominated(self) -> bool:
+        return self.value <= 0 and all(bid.is_dominated() for bid in self.bids)
+
+    def key(self) -> Tuple:
+        return ("ic", self.lb, self.ub, self.value, tuple(bid.key() for bid in self.bids))
+
 
     @staticmethod
     def XOR(value: int, bids: List[Bid]) -> Bid:
@@ -190,6 +246,458 @@ This class represents an internal node of the bid tree expressed in TBBL.
     
 
 
+class CompiledBids:
+    """
+This class represents the bid trees of all the bidders of an exchange,
+flattened once into parallel arrays with one entry per node, in preorder:
+bidder index, parent (global node index, -1 for roots), lb and ub (0 for
+leaves), value, good index and quantity (-1 and 0 for internal nodes).
+The nodes of the i-th bidder are those between ptr[i] and ptr[i + 1].
+    """
+    def __init__(self, nb_bidders: int, bidder, parent, lb, ub, value, good, quantity) -> None:
+        self.bidder = np.asarray(bidder, dtype=np.int64)
+        self.parent = np.asarray(parent, dtype=np.int64)
+        self.lb = np.asarray(lb, dtype=float)
+        self.ub = np.asarray(ub, dtype=float)
+        self.value = np.asarray(value, dtype=float)
+        self.good = np.asarray(good, dtype=np.int64)
+        self.quantity = np.asarray(quantity, dtype=float)
+        self.ptr = np.concatenate([[0], np.cumsum(np.bincount(self.bidder, minlength=nb_bidders))])
+
+    @classmethod
+    def from_bids(cls, bids: List[Bid], good_idx) -> 'CompiledBids':
+        """
+        Compiles the given bid trees (one per bidder, None if the bidder has
+        no bid). good_idx maps a good to its index.
+        """
+        bidder, parent, lb, ub, value, good, quantity = [], [], [], [], [], [], []
+        for i, bid in enumerate(bids):
+            if bid is None:
+                continue
+            stack = [(bid, -1)]
+            while stack:
+                node, node_parent = stack.pop()
+                k = len(bidder)
+                bidder.append(i)
+                parent.append(node_parent)
+                value.append(node.value)
+                if isinstance(node, IntervalChoose):
+                    lb.append(node.lb)
+                    ub.append(node.ub)
+                    good.append(-1)
+                    quantity.append(0)
+                    stack.extend((child, k) for child in reversed(node.bids))
+                else:
+                    lb.append(0)
+                    ub.append(0)
+                    good.append(good_idx(node.good))
+                    quantity.append(node.quantity)
+        return cls(len(bids), bidder, parent, lb, ub, value, good, quantity)
+
+    @classmethod
+    def concatenate(cls, blocks: List['CompiledBids']) -> 'CompiledBids':
+        """
+        Concatenates the compiled bid trees of single bidders (one per bidder,
+        None if the bidder has no bid) into the compiled trees of all of them.
+        """
+        present = [(i, block) for i, block in enumerate(blocks) if block is not None]
+        if not present:
+            return cls.from_bids([None for _ in blocks], {}.get)
+        offsets = np.cumsum([0] + [len(block.parent) for _, block in present[:-1]])
+        return cls(len(blocks),
+                   np.concatenate([np.full(len(block.parent), i) for i, block in present]),
+                   np.concatenate([np.where(block.parent >= 0, block.parent + offset, -1)
+                                   for (_, block), offset in zip(present, offsets)]),
+                   *(np.concatenate([getattr(block, field) for _, block in present])
+                     for field in ('lb', 'ub', 'value', 'good', 'quantity')))
+
+    @property
+    def nb_bidders(self) -> int:
+        return len(self.ptr) - 1
+
+    def has_bid(self) -> np.ndarray:
+        """
+        Returns the boolean vector of the bidders having a bid tree.
+        """
+        return self.ptr[1:] > self.ptr[:-1]
+
+    def components(self, nb_goods: int) -> Tuple[int, np.ndarray]:
+        """
+        Computes the independent sub-markets, i.e. the connected components
+        of the bipartite graph linking each bidder to the goods of its
+        leaves. Returns the number of components and the component label of
+        each bidder, then of each good.
+        """
+        n = self.nb_bidders
+        leaves = np.flatnonzero(self.good >= 0)
+        graph = coo_matrix((np.ones(len(leaves)), (self.bidder[leaves], n + self.good[leaves])),
+                           shape=(n + nb_goods, n + nb_goods))
+        return connected_components(graph, directed=False)
+
+    def subset(self, bidders, goods) -> 'CompiledBids':
+        """
+        Returns the bid trees of the given bidders only, with bidders and goods
+        renumbered by their positions in the given index arrays (the given
+        goods must include all the goods of their leaves).
+        """
+        bidder_map = np.full(self.nb_bidders, -1)
+        bidder_map[bidders] = np.arange(len(bidders))
+        nodes = np.flatnonzero(bidder_map[self.bidder] >= 0)
+        node_map = np.full(len(self.bidder) + 1, -1)
+        node_map[nodes] = np.arange(len(nodes))
+        good_map = np.full(self.good.max(initial=-1) + 2, -1)
+        good_map[goods] = np.arange(len(goods))
+        return CompiledBids(len(bidders), bidder_map[self.bidder[nodes]], node_map[self.parent[nodes]],
+                            self.lb[nodes], self.ub[nodes], self.value[nodes],
+                            good_map[self.good[nodes]], self.quantity[nodes])
+
+
+def _solve_wdp(allocation, tree: CompiledBids, config: Dict, name: str, deadline: float = None,
+               start: Tuple[np.ndarray, np.ndarray] = None):
+    """
+    Builds and solves the Winner Determination problem of the given initial
+    allocation and bid trees with the solver given by the configuration (or
+    approximately, if config['WDP_ENGINE'] is a heuristic one, see
+    `core.wdp.ExchangeWDP.solve_heuristic`),
+    stopping at the given deadline (a `time.time()` value) if any, and when
+    the relative gap config['WDP_MIP_GAP'] is reached if set. start is an
+    optional feasible (trade matrix, node satisfaction vector) pair, passed
+    as a MIP start to the solvers supporting it (CBC and CPLEX).
+    Returns the trade matrix, the payment vector, whether the solution is
+    optimal, an upper bound on the optimal welfare and the node satisfaction
+    vector. If the solver found no solution, nothing is traded.
+    If config['SOLVER'] is 'PORTFOLIO', the solvers of config['WDP_PORTFOLIO']
+    are raced (see `_race_wdp`).
+    This is a module-level function so that it can run in a worker process.
+    """
+    if config['SOLVER'] == 'PORTFOLIO' and (config.get('WDP_ENGINE') or 'EXACT') == 'EXACT':
+        return _race_wdp(allocation, tree, config, name, deadline, start)
+    build_start = time.time()
+    wdp = ExchangeWDP(allocation, tree, config.get('SPARSE_WDP', False))
+    initial = None if start is None else wdp.solution(*start)
+    solve_start = time.time()
+    time_limit = None if deadline is None else deadline - solve_start
+    if time_limit is not None and time_limit <= 0:
+        x, optimal, bound = None, False, np.inf
+    else:
+        x, optimal, bound = solve_exchange_wdp(wdp, config, name, time_limit, initial)
+    solve_end = time.time()
+    if x is None:
+        x = wdp.trivial_solution() if initial is None or wdp.vectors()[0] @ initial < 0 else initial
+    bound = min(bound, wdp.trivial_bound())
+    if config.get('WDP_EXPORT_DIR'):
+        export_wdp(wdp, config, name, solve_start - build_start, solve_end - solve_start,
+                   optimal, (wdp.vectors()[0] @ x).item(), bound)
+    return wdp.trades(x), wdp.payments(x), optimal, bound, wdp.sats(x)
+
+
+def solve_exchange_wdp(wdp: ExchangeWDP, config: Dict, name: str, time_limit: float = None,
+                       start: np.ndarray = None):
+    """
+    Solves the given Winner Determination problem with the solver (or the
+    heuristic engine) given by the configuration, within time_limit seconds
+    if not None, and when the relative gap config['WDP_MIP_GAP'] is reached
+    if set. start is an optional initial solution of the program.
+    Returns the solution (None if none was found), whether it is optimal and
+    an upper bound on the optimal welfare, as `core.wdp.WDP.solve_highs`.
+    """
+    mip_gap = config.get('WDP_MIP_GAP')
+    # The trivial solution (no trade) is feasible with a welfare of 0, so that
+    # a start below it is useless, and was seen to mislead CBC
+    if start is not None and wdp.vectors()[0] @ start < 0:
+        start = None
+    if (config.get('WDP_ENGINE') or 'EXACT') != 'EXACT':
+        return wdp.solve_heuristic(config['WDP_ENGINE'], time_limit)
+    if config['SOLVER'] == 'HIGHS':
+        return wdp.solve_highs(time_limit, mip_gap)
+    solve_start = time.time()
+    if config['SOLVER'] == 'CPLEX':
+        solver = pulp.CPLEX(path=config['CPLEX_PATH'], msg=1, keepFiles=1,
+                            timeLimit=time_limit, gapRel=mip_gap, warmStart=start is not None)
+    elif config['SOLVER'] == 'CBC':
+        # CBC's preprocessing was seen to return wrong "optimal" solutions of these programs
+        solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapRel=mip_gap,
+                                   warmStart=start is not None, options=['preprocess off'])
+    else:
+        solver = pulp.GLPK(msg=False,
+                           timeLimit=None if time_limit is None else max(1, int(time_limit)),
+                           options=[] if mip_gap is None else ['--mipgap', str(mip_gap)])
+    x, optimal, bound = wdp.solve_pulp(solver, name, start)
+    # PuLP reports solutions found within the limits as optimal
+    if mip_gap or (time_limit is not None and time.time() - solve_start >= time_limit):
+        optimal, bound = False, np.inf
+    # Nor is a warm-started solution worse than its start optimal, whatever
+    # the solver says: the start is kept instead
+    if start is not None and x is not None and wdp.vectors()[0] @ x < wdp.vectors()[0] @ start - 1e-6:
+        x, optimal, bound = start, False, np.inf
+    return x, optimal, bound
+
+
+def export_wdp(wdp: ExchangeWDP, config: Dict, name: str, build_time: float, solve_time: float,
+               optimal: bool, welfare: float, bound: float) -> str:
+    """
+    Adds the given solved Winner Determination problem to the corpus of
+    config['WDP_EXPORT_DIR'], as three files sharing a unique base name (made
+    of the given name and a random suffix, since a sub-market is solved again
+    at every round): the program itself (.mps, or .lp if
+    config['WDP_EXPORT_FORMAT'] is 'LP'), its initial allocation and bid
+    trees (.npz, see `load_wdp`), from which both formulations can be built
+    again, and its metadata (.json): sizes, solver, build and solve times
+    (in seconds) and result.
+    Returns the base path of the files.
+    """
+    directory = config['WDP_EXPORT_DIR']
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f'{name}_{uuid.uuid4().hex[:8]}')
+    extension = '.lp' if (config.get('WDP_EXPORT_FORMAT') or 'MPS').upper() == 'LP' else '.mps'
+    wdp.export(base + extension, os.path.basename(base))
+    tree = wdp.tree
+    np.savez(base + '.npz', allocation=wdp.allocation, bidder=tree.bidder, parent=tree.parent, lb=tree.lb,
+             ub=tree.ub, value=tree.value, good=tree.good, quantity=tree.quantity)
+    metadata = {
+        "name": name,
+        "bidders": wdp.n,
+        "goods": wdp.m,
+        "nodes": len(tree.parent),
+        "variables": wdp.nb_variables,
+        "rows": wdp.nb_rows,
+        "nonzeros": wdp.matrix().nnz,
+        "sparse": bool(config.get('SPARSE_WDP', False)),
+        "solver": config['SOLVER'],
+        "engine": config.get('WDP_ENGINE') or 'EXACT',
+        "build_time": build_time,
+        "solve_time": solve_time,
+        "optimal": bool(optimal),
+        "welfare": welfare,
+        "bound": None if np.isinf(bound) else bound
+    }
+    with open(base + '.json', 'w') as file:
+        json.dump(metadata, file, indent=2)
+    return base
+
+
+def load_wdp(path: str) -> Tuple[np.ndarray, CompiledBids]:
+    """
+    Reads the initial allocation and the bid trees of a Winner Determination
+    problem exported by `export_wdp` (path being its .npz file).
+    """
+    with np.load(path) as data:
+        allocation = data['allocation']
+        return allocation, CompiledBids(allocation.shape[0], *(data[field] for field in (
+            'bidder', 'parent', 'lb', 'ub', 'value', 'good', 'quantity')))
+
+
+def _race_wdp(allocation, tree: CompiledBids, config: Dict, name: str, deadline: float = None,
+              start: Tuple[np.ndarray, np.ndarray] = None):
+    """
+    Solves the Winner Determination problem (see `_solve_wdp`) with each of
+    the solvers of config['WDP_PORTFOLIO'] in its own process, and returns the
+    first optimal result, after killing the other processes (and the solvers
+    they run). If no solver proves optimality, the best solution is returned
+    with the best bound of all the solvers. The exception of a failing solver
+    is only raised if all of them fail.
+    """
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_race_worker,
+                                         args=(results, (allocation, tree, dict(config, SOLVER=solver),
+                                                         f'{name}_{solver}', deadline, start)))
+                 for solver in config.get('WDP_PORTFOLIO') or ['GLPK', 'CBC', 'HIGHS']]
+    for process in processes:
+        process.start()
+    finished = []
+    try:
+        while len(finished) < len(processes):
+            # The solvers stop by themselves at the deadline; a process that
+            # does not is not waited for much longer
+            timeout = None if deadline is None else max(deadline - time.time(), 0) + 10
+            try:
+                result = results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            finished.append(result)
+            if not isinstance(result, Exception) and result[2]:
+                return result
+    finally:
+        for process in processes:
+            if process.is_alive():
+                try:
+                    # Kill the process group, so that command-line solvers die as well
+                    os.killpg(process.pid, signal.SIGKILL)
+                except (AttributeError, OSError):
+                    process.kill()
+            process.join()
+    solved = [result for result in finished if not isinstance(result, Exception)]
+    if not solved:
+        if finished:
+            raise finished[0]
+        # No solver answered in time: nothing is traded (or the start is kept)
+        return _solve_wdp(allocation, tree, dict(config, SOLVER='HIGHS'), name, time.time(), start)
+    trades, payments, _, _, sats = max(solved, key=lambda result: result[1].sum())
+    return trades, payments, False, min(result[3] for result in solved), sats
+
+
+def _race_worker(results, args) -> None:
+    """
+    Runs `_solve_wdp` with the given arguments in a process of a solver race
+    (see `_race_wdp`), and puts its result (or exception) in the results queue.
+    The process has its own process group, so that it can be killed along
+    with the solver it runs.
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    try:
+        results.put(_solve_wdp(*args))
+    except Exception as exception:
+        results.put(exception)
+
+
+# Configuration keys that may change the result of a WDP solve
+WDP_CACHE_KEYS = ('SOLVER', 'SPARSE_WDP', 'WDP_ENGINE', 'WDP_MIP_GAP', 'WDP_PORTFOLIO')
+
+# Configuration keys read by the exchanges, the only ones kept in their snapshots
+EXCHANGE_CONFIG_KEYS = ('SOLVER', 'CPLEX_PATH', 'SPARSE_WDP', 'WDP_PROCESSES', 'WDP_TIME_LIMIT', 'WDP_MIP_GAP',
+                        'WDP_ENGINE', 'WDP_PORTFOLIO', 'WDP_CACHE_SIZE', 'WDP_CACHE_DIR', 'WDP_CACHE_DISK_SIZE',
+                        'WDP_EXPORT_DIR', 'WDP_EXPORT_FORMAT', 'CE_PAYMENT_RULE')
+
+
+def wdp_key(allocation, tree: CompiledBids, config: Dict) -> str:
+    """
+    Returns the SHA-256 hash (hexadecimal) identifying the Winner Determination
+    problem of the given initial allocation and (normalized) bid trees, solved
+    with the given configuration: the solver options that may change its
+    result are included, not the names of the bidders and goods.
+    """
+    digest = hashlib.sha256(b'CE-WDP-1')
+    digest.update(json.dumps({key: config.get(key) for key in WDP_CACHE_KEYS}, sort_keys=True).encode())
+    allocation = np.asarray(allocation, dtype=float)
+    digest.update(np.asarray(allocation.shape, dtype=np.int64).tobytes())
+    digest.update((allocation + 0.).tobytes())
+    for field in (tree.bidder, tree.parent, tree.good):
+        digest.update(np.asarray(len(field), dtype=np.int64).tobytes())
+        digest.update(field.astype(np.int64).tobytes())
+    for field in (tree.lb, tree.ub, tree.value, tree.quantity):
+        # + 0. turns -0. into 0.
+        digest.update((field.astype(float) + 0.).tobytes())
+    return digest.hexdigest()
+
+
+class WDPCache:
+    """
+This class represents a bounded cache of the optimal results of `_solve_wdp`,
+indexed by `wdp_key`: an in-memory LRU of size entries, backed, if directory
+is given, by an on-disk LRU of at most disk_size files (one .npz file per
+result, so that the cache is shared by all the processes using directory).
+    """
+    def __init__(self, size: int = 128, directory: str = None, disk_size: int = 1024) -> None:
+        self.size = size
+        self.directory = directory
+        self.disk_size = disk_size
+        self.results = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str):
+        """
+        Returns the result cached under the given key (None if there is none).
+        """
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self._copy(self.results[key])
+        if self.directory is None:
+            return None
+        path = os.path.join(self.directory, key + '.npz')
+        try:
+            with np.load(path) as data:
+                result = (data['trades'], data['payments'], True, data['bound'].item(), data['sats'])
+            # The modification time orders the on-disk LRU
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        self._remember(key, result)
+        return self._copy(result)
+
+    def put(self, key: str, result) -> None:
+        """
+        Caches the given optimal result under the given key.
+        """
+        self._remember(key, self._copy(result))
+        if self.directory is None:
+            return
+        trades, payments, _, bound, sats = result
+        path = os.path.join(self.directory, key + '.npz')
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            np.savez(file, trades=trades, payments=payments, bound=np.asarray(bound), sats=sats)
+        os.replace(temporary, path)
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.endswith('.npz')]
+        if len(paths) > self.disk_size:
+            paths.sort(key=lambda path: os.stat(path).st_mtime)
+            for path in paths[:len(paths) - self.disk_size]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _remember(self, key: str, result) -> None:
+        """
+        Stores the given result in the in-memory LRU.
+        """
+        if self.size <= 0:
+            return
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    @staticmethod
+    def _copy(result):
+        trades, payments, optimal, bound, sats = result
+        return trades.copy(), payments.copy(), optimal, bound, sats.copy()
+
+
+# Caches shared by the exchanges, by size, directory and disk size
+_wdp_caches = {}
+
+
+def wdp_cache(config: Dict) -> WDPCache:
+    """
+    Returns the cache of WDP results given by the configuration
+    (config['WDP_CACHE_SIZE'] in-memory entries and, if
+    config['WDP_CACHE_DIR'] is set, config['WDP_CACHE_DISK_SIZE'] files
+    in this directory), or None if caching is disabled.
+    """
+    size = config.get('WDP_CACHE_SIZE', 128) or 0
+    directory = config.get('WDP_CACHE_DIR')
+    if size <= 0 and directory is None:
+        return None
+    settings = (size, directory, config.get('WDP_CACHE_DISK_SIZE', 1024))
+    if settings not in _wdp_caches:
+        _wdp_caches[settings] = WDPCache(*settings)
+    return _wdp_caches[settings]
+
+
+def threshold_discounts(discounts, budget: float) -> np.ndarray:
+    """
+    Returns the Threshold discounts (Parkes, Kalagnanam and Eso, IJCAI'01)
+    for the given Vickrey discounts: the discounts are reduced as evenly as
+    possible (by "water-filling" from the largest one down) so that their sum
+    does not exceed the budget, i.e. the surplus of the exchange.
+    """
+    discounts = np.maximum(np.asarray(discounts, dtype=float), 0)
+    budget = max(budget, 0)
+    if discounts.sum() <= budget:
+        return discounts
+    # The discounts are capped at a level such that their sum is the budget
+    ordered = np.sort(discounts)[::-1]
+    totals = np.cumsum(ordered)
+    for k in range(1, len(ordered) + 1):
+        level = (totals[k - 1] - budget) / k
+        if k == len(ordered) or ordered[k] <= level:
+            break
+    return np.maximum(discounts - level, 0)
+
+
 class CombinatorialExchange(Auction):
     """
 This class represents the combinatorial exchange mechanism. In this
@@ -197,6 +705,8 @@ mechanism, The bidders initially hold goods and bid for exchanges
 using the TBBL language. A winner determination optimization program
 is run to determine which exchanges are made. This auction is a one-step auction.
     """
+    snapshot_kind = 'CE'
+
     def __init__(self, bidders: List[Bidder], goods: List[GoodType],
                  allocation: List[List[int]],
                  config: Dict={'SOLVER': 'GLPK'}) -> None:
@@ -206,12 +716,22 @@ is run to determine which exchanges are made. This auction is a one-step auction
         """
         super().__init__("Combinatorial Exchange", bidders, goods)
         self.bids = [None for _ in self.bidders]
-        self.trades = [[0 for _ in self.goods] for _ in self.bidders]
-        self.payments = [0 for _ in self.bidders]
-        self.allocation = allocation
-        self.initial_allocation = allocation
+        self.initial_allocation = np.array(allocation).reshape(self.n, self.m)
+        self.allocation = self.initial_allocation.copy()
         self.terminated = False
         self.config = config
+        self.optimal = None
+        self.progress = None
+        # Persistent model: compiled bid tree of every bidder (None until compiled, or
+        # after the bidder revised its bid), solutions and Vickrey discounts of the
+        # sub-markets solved last (by bidders and goods), and last solution
+        self._blocks = [None for _ in self.bidders]
+        self._solutions = {}
+        self._discounts = {}
+        self._incumbent = None
+        # Prefix of the names of the solver problems and files of this auction,
+        # so that several exchanges can be solved concurrently
+        self.namespace = f"Winner_Determination_{uuid.uuid4().hex}"
 
     def does(self, bidder: Bidder, action: Bid) -> None:
         """
@@ -225,6 +745,7 @@ is run to determine which exchanges are made. This auction is a one-step auction
             if type(action) == Dict:
                 action = Bid.from_dict(action, {good.name: good for good in self.goods})
             self.bids[bidder] = action
+            self._blocks[bidder] = None
 
     def is_legal(self, action: Tuple[Bidder, Bid]) -> bool:
         """
@@ -241,110 +762,403 @@ is run to determine which exchanges are made. This auction is a one-step auction
         return bid.has_valid_goods(self.goods)
         
 
-    def next(self) -> None:
+    def next(self, on_progress=None) -> None:
         """
         Computes the next state. Here, the Winner Determination problem described on page 27 of the JAAMAS'21
-        paper by Mittelman et al. is used.
-        """
-        prob = pulp.LpProblem("Winner_Determination", pulp.LpMaximize)
-        obj = pulp.LpVariable("obj", 0, None, pulp.LpContinuous)
-        prob += obj
-        # We build the set of trade variables
-        trade = [
-            pulp.LpVariable.dicts(f"lambda_{i}", range(self.m), None, None, pulp.LpInteger)
-            for i in range(self.n)
-        ]
-
-        # No agent sells more items than she initially holds (C1)
-        for i in range(self.n):
-            for j in range(self.m):
-                prob += (trade[i][j] + self.initial_allocation[i][j] >= 0)
-        # Free disposal is allowed but not to create goods from scratch (C2)
-        for j, _ in enumerate(self.goods):
-                prob += (pulp.lpSum([trade[i][j] for i in range(self.n)]) <= 0)
-
-        # We add the constraints related to the satisfaction of the bid tree (C3)
-        for i, bid in enumerate(self.bids):
-            if bid is not None:
-                # First, the R1 constraints for any ic node
-                for constraint in bid.collect_ic_constraints():
-                    prob += constraint
-                # Second, the R2 constraints for any leaf node
-                node_variables = {
-                    good: ([], [])
-                    for good in self.goods
-                }
-                bid.collect_node_variables(node_variables)                
-                for j, good in enumerate(self.goods):
-                    tab = [sat * q for sat, q in zip(*node_variables[good])]
-                    if tab:
-                        prob += (pulp.lpSum(tab) <= trade[i][j])
-                    else:
-                        prob += (0 <= trade[i][j])
-                        # This contraint ensures that an agent only sells goods
-                        # if they appear as goods to sell in the bid tree
-
-        # Constraint C4 is implicit
-
-        # Individual utilities
-        u = pulp.LpVariable.dicts("u", range(self.n), None, None, pulp.LpContinuous)
-        for i, bid in enumerate(self.bids):
-            if bid is not None:
-                l = []
-                bid.collect_node_variables_and_values(l)
-                prob += (pulp.lpSum([sat * value for sat, value in l]) == u[i])
-        
-        # Objective variable + constraint
-        prob += (pulp.lpSum(u) == obj)
-        if self.config['SOLVER'] == 'CPLEX':
-            solver = pulp.CPLEX(path=self.config['CPLEX_PATH'], msg=1, keepFiles=1)
-        else:
-            solver = pulp.GLPK(msg=False)
-        prob.solve(solver)
-        # print(prob)
-        # for var in prob.variables():
-        #     d = var.toDict()
-        #     print(d)
-        assert prob.status == pulp.LpStatusOptimal,\
-            "The solver was not able to solve the WDP problem optimally..."
-        self.trades = [[trade[i][j].varValue for j in range(self.m)] for i in range(self.n)]
-        self.allocation = [[self.allocation[i][j] + self.trades[i][j] for j in range(self.m)]
-                           for i in range(self.n)]
+        paper by Mittelman et al. is used (see `solve`), and the exchange is terminated. The persistent model
+        of `solve` is discarded, so that nothing is reused after this call.
+        """
+        self.solve(on_progress)
+        self.allocation = self.allocation + self.trades.toarray()
         self.bids = [None for _ in self.bidders]
-        self.payments = [u[i].varValue for i in range(len(self.bidders))]
+        self._blocks = [None for _ in self.bidders]
+        self._solutions = {}
+        self._discounts = {}
+        self._incumbent = None
         self.terminated = True
+        self._touch(range(self.n), range(self.m))
 
-    def state(self):
+    def abort(self) -> None:
         """
-        Returns a JSON representation of the auction state.
-        Useful for the auction server.
+        Terminates the exchange without any trade, e.g. when its Winner Determination problem could not
+        be solved in time (the outcome is then not deemed optimal).
         """
-        auction_state = {}
-        auction_state["joint_trade"] = {
-            str(bidder): {
-                str(good): self.trades[i][j]
-                for j, good in enumerate(self.goods)
-                if self.trades[i][j]
-            }
-            for i, bidder in enumerate(self.bidders)
-            }
-        auction_state["joint_allocation"] = {
-            str(bidder): {
-                str(good): self.allocation[i][j]
-                for j, good in enumerate(self.goods)
-                if self.allocation[i][j]
-            }
-            for i, bidder in enumerate(self.bidders)
-            }
-        auction_state["joint_payment"] = {
-            str(bidder): self.payments[j]
-            for j, bidder in enumerate(self.bidders)
-            if self.payments[j]
+        self.trades = SparseTrades(self.n, self.m)
+        self.payments = np.zeros(self.n)
+        self.optimal = False
+        self.bids = [None for _ in self.bidders]
+        self._blocks = [None for _ in self.bidders]
+        self._solutions = {}
+        self._discounts = {}
+        self._incumbent = None
+        self.terminated = True
+        self._touch(range(self.n), range(self.m))
+
+    def solve(self, on_progress=None) -> None:
+        """
+        Solves the Winner Determination problem (see `core.wdp.ExchangeWDP`) for the current bids, in its
+        sparse formulation if config['SPARSE_WDP'] is True, and sets the trades and payments accordingly,
+        without terminating the exchange. The problem is solved in-process by HiGHS if config['SOLVER']
+        is 'HIGHS', through PuLP (with GLPK, CBC or CPLEX) otherwise, or by the solvers of
+        config['WDP_PORTFOLIO'] racing in separate processes if it is 'PORTFOLIO'.
+        The payments are the values of the bids (pay-as-bid) or, if config['CE_PAYMENT_RULE'] is 'VCG'
+        or 'THRESHOLD', these values minus the Vickrey or Threshold discounts (see `threshold_discounts`).
+        The bid trees are normalized first (see `Bid.normalized`), and the dominated ones ignored.
+        The problem is then decomposed into independent sub-markets (see `CompiledBids.components`),
+        which are solved in-process, or on a pool of config['WDP_PROCESSES'] worker processes (all the
+        cores if None) if it is not 1 and several sub-markets must be solved.
+        The solve stops after config['WDP_TIME_LIMIT'] seconds, or when the relative gap
+        config['WDP_MIP_GAP'] is reached, with the best solutions found so far; the "optimal"
+        proposition tells whether the outcome is optimal. If config['WDP_ENGINE'] is 'LP_ROUNDING'
+        or 'GREEDY', the sub-markets are only solved approximately, with a gap to the bound of their
+        linear relaxation (see `core.wdp.ExchangeWDP.solve_heuristic`). While solving, `progress`
+        is updated (and passed to on_progress, if given) each time a sub-market is solved, and only then:
+        the solvers report nothing while solving a sub-market, so that an exchange made of a single
+        sub-market only reports its progress before and after solving it.
+        The model persists between calls to `solve`, so that bidders can revise their bids (iterative
+        exchange): only the bid trees of the bidders who called `does` since the last solve are compiled
+        again, and the sub-markets none of whose bidders revised their bids keep their optimal solutions.
+        The programs of the other sub-markets are built again from the compiled trees at every solve (no
+        solver state is kept). The last solution, if it is still feasible, is passed to the others as a MIP start, which only the
+        CBC and CPLEX backends use (HiGHS and GLPK solve them from scratch). `next` discards the model, so
+        the reuse only benefits the callers of `solve` (not the server, which only calls `next`).
+        """
+        start = time.time()
+        time_limit = self.config.get('WDP_TIME_LIMIT')
+        deadline = None if time_limit is None else start + time_limit
+        revised = {i for i, bid in enumerate(self.bids) if bid is not None and self._blocks[i] is None}
+        for i in revised:
+            # The bid trees are normalized first, and dominated ones ignored
+            bid = self.bids[i].normalized()
+            bid = None if bid is None or bid.is_dominated() else bid
+            self._blocks[i] = CompiledBids.from_bids([bid], self.get_good_idx)
+        tree = CompiledBids.concatenate(self._blocks)
+        config = {key: self.config.get(key)
+                  for key in ('CPLEX_PATH', 'WDP_EXPORT_DIR', 'WDP_EXPORT_FORMAT') + WDP_CACHE_KEYS}
+        # The WDP is split into independent sub-markets, solved separately
+        nb_components, labels = tree.components(self.m)
+        has_bid = tree.has_bid()
+        tasks = []
+        for c in range(nb_components):
+            bidders = np.flatnonzero((labels[:self.n] == c) & has_bid)
+            if len(bidders):
+                goods = np.flatnonzero(labels[self.n:] == c)
+                tasks.append((bidders, goods, self.initial_allocation[np.ix_(bidders, goods)],
+                              tree.subset(bidders, goods), config, f'{self.namespace}_{c}', deadline,
+                              self._start(bidders, goods, revised)))
+        # Progress: the bound of an unsolved sub-market is the sum of its positive node values,
+        # and its incumbent is the trivial solution (no trade)
+        bounds = [np.maximum(task[3].value, 0).sum().item() for task in tasks]
+        incumbents = [0. for _ in tasks]
+        results = [None for _ in tasks]
+
+        def report(k, result):
+            results[k] = result
+            incumbents[k] = result[1].sum().item()
+            bounds[k] = result[3]
+            self._report_progress(start, bounds, incumbents, results, on_progress)
+
+        self._report_progress(start, bounds, incumbents, results, on_progress)
+        keys = [(tuple(task[0].tolist()), tuple(task[1].tolist())) for task in tasks]
+        # Sub-markets whose bidders revised their bids are solved again
+        self._solutions = {key: result for key, result in self._solutions.items() if not revised & set(key[0])}
+        self._discounts = {key: discounts for key, discounts in self._discounts.items() if key in self._solutions}
+        unsolved = []
+        for k, key in enumerate(keys):
+            if key in self._solutions:
+                report(k, self._solutions[key])
+            else:
+                unsolved.append(k)
+        self._solve([tasks[k][2:] for k in unsolved], lambda k, result: report(unsolved[k], result))
+        trades = np.zeros((self.n, self.m))
+        self.payments = np.zeros(self.n)
+        sats = [None for _ in self.bidders]
+        for (bidders, goods, _, component_tree, *_), (component_trades, component_payments, _, _,
+                                                        component_sats) in zip(tasks, results):
+            trades[np.ix_(bidders, goods)] = component_trades
+            self.payments[bidders] = component_payments
+            for k, bidder in enumerate(bidders.tolist()):
+                sats[bidder] = component_sats[component_tree.ptr[k]:component_tree.ptr[k + 1]]
+        self.optimal = all(result[2] for result in results)
+        self._incumbent = (trades, sats)
+        # Only optimal solutions are kept: the others will be improved by the next solve
+        self._solutions = {key: result for key, result in zip(keys, results) if result[2]}
+        payment_rule = self.config.get('CE_PAYMENT_RULE', 'BID')
+        if payment_rule in ('VCG', 'THRESHOLD'):
+            discounts = self._vickrey_discounts(tasks, results, keys, deadline)
+            if payment_rule == 'THRESHOLD':
+                discounts = threshold_discounts(discounts, self.payments.sum())
+            self.payments = self.payments - discounts
+        self.trades = SparseTrades.from_array(trades)
+        self._touch(range(self.n), range(self.m))
+
+    def _start(self, bidders, goods, revised):
+        """
+        Returns the MIP start of the sub-market made of the given bidders and
+        goods: the last solution, where the bidders who revised their bids
+        do not trade anything, provided it is still feasible and better than
+        no trade at all (None otherwise).
+        """
+        if self._incumbent is None:
+            return None
+        trades, sats = self._incumbent
+        trades = trades[np.ix_(bidders, goods)]
+        start_sats = []
+        for k, bidder in enumerate(bidders.tolist()):
+            if bidder in revised or sats[bidder] is None:
+                trades[k] = 0
+                start_sats.append(np.zeros(len(self._blocks[bidder].parent)))
+            else:
+                start_sats.append(sats[bidder])
+        if trades.sum(axis=0).max(initial=0) > 0:
+            return None
+        # The sellers whose buyers revised their bids may be left with their costs only
+        if sum(self._blocks[bidder].value @ bidder_sats
+               for bidder, bidder_sats in zip(bidders.tolist(), start_sats)) < 0:
+            return None
+        return trades, np.concatenate(start_sats)
+
+    def _solve(self, args, callback=None):
+        """
+        Solves the Winner Determination problems given by the argument tuples
+        of `_solve_wdp`, calling callback(k, result) as soon as the k-th one
+        is solved. They are solved in-process, unless config['WDP_PROCESSES']
+        is not 1 and several of them are not cached: they are then solved on
+        a pool of that many worker processes (all the cores if None).
+        The optimal results are cached (see `wdp_cache`), so that the problems
+        already solved are not solved again.
+        Returns the list of the results.
+        """
+        results = [None for _ in args]
+        cache = wdp_cache(self.config)
+        keys = [None if cache is None else wdp_key(*arg[:3]) for arg in args]
+
+        def solved(k, result):
+            results[k] = result
+            # Only optimal results are cached, so that a hit is as good as a solve
+            if keys[k] is not None and result[2]:
+                cache.put(keys[k], result)
+            if callback is not None:
+                callback(k, result)
+
+        unsolved = []
+        for k, key in enumerate(keys):
+            result = None if key is None else cache.get(key)
+            if result is None:
+                unsolved.append(k)
+            else:
+                results[k] = result
+                if callback is not None:
+                    callback(k, result)
+        processes = self.config.get('WDP_PROCESSES', 1) or os.cpu_count()
+        if processes > 1 and len(unsolved) > 1:
+            with ProcessPoolExecutor(min(processes, len(unsolved))) as pool:
+                futures = {pool.submit(_solve_wdp, *args[k]): k for k in unsolved}
+                for future in as_completed(futures):
+                    solved(futures[future], future.result())
+        else:
+            for k in unsolved:
+                solved(k, _solve_wdp(*args[k]))
+        return results
+
+    def _vickrey_discounts(self, tasks, results, keys, deadline) -> np.ndarray:
+        """
+        Returns the Vickrey discount of every bidder, i.e. the difference
+        between the optimal welfare and the optimal welfare without this
+        bidder. Only the sub-market of a bidder is solved again without it,
+        and only if the bidder trades or gets some value: otherwise, its
+        discount is 0. The WDPs without each bidder are solved concurrently,
+        starting from the solution with this bidder, when it is still
+        feasible. If one of them is not solved optimally, the discount is
+        computed from its bound, hence never overestimated.
+        The discounts of the sub-markets whose solutions were kept from the
+        last solve are kept as well.
+        """
+        discounts = np.zeros(self.n)
+        marginal_tasks = []
+        for key, (bidders, goods, allocation, tree, config, name, *_), (trades, payments, _, _, sats) \
+                in zip(keys, tasks, results):
+            if key in self._discounts:
+                discounts[bidders] = self._discounts[key]
+                continue
+            for k, bidder in enumerate(bidders.tolist()):
+                if not trades[k].any() and not payments[k]:
+                    continue
+                if len(bidders) == 1:
+                    # Without the bidder, the sub-market is empty
+                    discounts[bidder] = max(payments.sum(), 0)
+                    continue
+                others = np.delete(np.arange(len(bidders)), k)
+                nodes = tree.bidder != k
+                # Without the bidder, the solution is feasible if it did not sell anything
+                start = (trades[others], sats[nodes]) if trades[others].sum(axis=0).max(initial=0) <= 0 \
+                    else None
+                marginal_tasks.append((bidder, payments.sum(),
+                                       (allocation[others], tree.subset(others, np.arange(len(goods))),
+                                        config, f'{name}_{bidder}', deadline, start)))
+        marginal_results = self._solve([task[2] for task in marginal_tasks])
+        for (bidder, welfare, _), (_, payments, optimal, bound, _) in zip(marginal_tasks, marginal_results):
+            discounts[bidder] = max(welfare - (payments.sum() if optimal else bound), 0)
+            self.optimal = self.optimal and optimal
+        self._discounts = {key: discounts[list(key[0])] for key in keys if key in self._solutions}
+        return discounts
+
+    def _report_progress(self, start, bounds, incumbents, results, on_progress) -> None:
+        """
+        Updates the progress of the current solve (elapsed time in seconds,
+        upper bound on the welfare, welfare of the best solution found so
+        far, relative gap between them, and number of solved sub-markets) and
+        passes it to on_progress.
+        """
+        bound, incumbent = sum(bounds), sum(incumbents)
+        self.progress = {
+            "elapsed": time.time() - start,
+            "bound": bound,
+            "incumbent": incumbent,
+            "gap": 0 if bound <= incumbent else (bound - incumbent) / abs(bound),
+            "solved": sum(result is not None for result in results),
+            "components": len(results)
             }
-        auction_state["propositions"] = {
+        if on_progress is not None:
+            on_progress(dict(self.progress))
+
+    def _write_snapshot(self, writer):
+        """
+        Writes the bids, the allocations, the configuration (only the keys of
+        `EXCHANGE_CONFIG_KEYS`), the outcome and the persistent model of the
+        exchange to a snapshot.
+        """
+        self._write_bids(writer)
+        writer.array(self.initial_allocation)
+        writer.array(self.allocation)
+        writer.json({key: self.config[key] for key in EXCHANGE_CONFIG_KEYS if key in self.config})
+        writer.value(self.optimal)
+        writer.json(self.progress)
+        writer.string(self.namespace)
+        # The compiled bid trees are written concatenated (see `CompiledBids.concatenate`)
+        writer.array(np.array([block is not None for block in self._blocks], dtype=bool))
+        tree = CompiledBids.concatenate(self._blocks)
+        for field in ('parent', 'lb', 'ub', 'value', 'good', 'quantity'):
+            writer.array(getattr(tree, field))
+        writer.array(tree.ptr)
+        writer.integer(len(self._solutions))
+        for (bidders, goods), (trades, payments, optimal, bound, sats) in self._solutions.items():
+            writer.array(np.array(bidders, dtype=np.int64))
+            writer.array(np.array(goods, dtype=np.int64))
+            writer.array(trades)
+            writer.array(payments)
+            writer.boolean(optimal)
+            writer.real(bound)
+            writer.array(sats)
+        writer.integer(len(self._discounts))
+        for (bidders, goods), discounts in self._discounts.items():
+            writer.array(np.array(bidders, dtype=np.int64))
+            writer.array(np.array(goods, dtype=np.int64))
+            writer.array(discounts)
+        writer.boolean(self._incumbent is not None)
+        if self._incumbent is not None:
+            trades, sats = self._incumbent
+            writer.array(trades)
+            for bidder_sats in sats:
+                writer.boolean(bidder_sats is not None)
+                if bidder_sats is not None:
+                    writer.array(bidder_sats)
+
+    def _read_snapshot(self, reader):
+        """
+        Reads back the fields written by `_write_snapshot`.
+        """
+        self.bids = self._read_bids(reader)
+        self.initial_allocation = reader.array()
+        self.allocation = reader.array()
+        self.config = reader.json()
+        self.optimal = reader.value()
+        self.progress = reader.json()
+        self.namespace = reader.string()
+        present = reader.array().tolist()
+        parent, lb, ub, value, good, quantity = (reader.array() for _ in range(6))
+        ptr = reader.array().tolist()
+        self._blocks = [None for _ in self.bidders]
+        for i in np.flatnonzero(present).tolist():
+            start, end = ptr[i], ptr[i + 1]
+            self._blocks[i] = CompiledBids(1, np.zeros(end - start, dtype=np.int64),
+                                           np.where(parent[start:end] >= 0, parent[start:end] - start, -1),
+                                           lb[start:end], ub[start:end], value[start:end], good[start:end],
+                                           quantity[start:end])
+        self._solutions = {}
+        for _ in range(reader.integer()):
+            key = (tuple(reader.array().tolist()), tuple(reader.array().tolist()))
+            self._solutions[key] = (reader.array(), reader.array(), reader.boolean(), reader.real(),
+                                    reader.array())
+        self._discounts = {}
+        for _ in range(reader.integer()):
+            key = (tuple(reader.array().tolist()), tuple(reader.array().tolist()))
+            self._discounts[key] = reader.array()
+        self._incumbent = None
+        if reader.boolean():
+            trades = reader.array()
+            self._incumbent = (trades, [reader.array() if reader.boolean() else None for _ in self.bidders])
+
+    def _write_bids(self, writer: SnapshotWriter) -> None:
+        """
+        Writes the bid trees to a snapshot, flattened in preorder: which
+        bidders have a bid, the number of children of every node (-1 for the
+        leaves), the good index of every leaf (-1 for the other nodes), and
+        the numbers of the nodes (quantity and value of a leaf, lb, ub and
+        value of another node).
+        """
+        children, goods, numbers = [], [], []
+        stack = [bid for bid in reversed(self.bids) if bid is not None]
+        while stack:
+            bid = stack.pop()
+            if isinstance(bid, Leaf):
+                children.append(-1)
+                goods.append(self.get_good_idx(bid.good))
+                numbers += (bid.quantity, bid.value)
+            else:
+                children.append(len(bid.bids))
+                goods.append(-1)
+                numbers += (bid.lb, bid.ub, bid.value)
+                stack.extend(reversed(bid.bids))
+        writer.array(np.array([bid is not None for bid in self.bids], dtype=bool))
+        writer.array(np.array(children, dtype=np.int64))
+        writer.array(np.array(goods, dtype=np.int64))
+        writer.values(numbers)
+
+    def _read_bids(self, reader: SnapshotReader) -> List[Bid]:
+        """
+        Reads back the bid trees written by `_write_bids`.
+        """
+        present = reader.array().tolist()
+        nodes = zip(reader.array().tolist(), reader.array().tolist())
+        numbers = iter(reader.values())
+
+        def read_bid():
+            nb_children, good = next(nodes)
+            if nb_children < 0:
+                return Leaf(next(numbers), self.goods[good], next(numbers))
+            lb, ub, value = next(numbers), next(numbers), next(numbers)
+            return IntervalChoose(lb, ub, value, [read_bid() for _ in range(nb_children)])
+
+        return [read_bid() if has_bid else None for has_bid in present]
+
+    def _allocation_row(self, i, trade_row):
+        """
+        Returns the current allocation of the i-th bidder, indexed by good names.
+        """
+        allocation = self.allocation[i]
+        return {str(self.goods[j]): allocation[j].item() for j in np.flatnonzero(allocation).tolist()}
+
+    def _propositions(self, propositions, goods):
+        """
+        Returns the "propositions" part of the state.
+        """
+        propositions = {
             "terminated": self.terminated
             }
-        return auction_state
+        if self.terminated:
+            propositions["optimal"] = self.optimal
+        return propositions
 
     def pretty(self):
         """
@@ -364,7 +1178,7 @@ is run to determine which exchanges are made. This auction is a one-step auction
         if self.is_terminated():            
             string += 'Current allocation:\n'
             string += '\n'.join(
-                str(bidder) + ' → {' + ', '.join(f'{good} × [{self.initial_allocation[i][j]} + {self.trades[i][j]} → {self.allocation[i][j]}]' for j, good in enumerate(self.goods)) + '}'
+                str(bidder) + ' → {' + ', '.join(f'{good} × [{self.initial_allocation[i][j]} + {self.trades[i, j]} → {self.allocation[i][j]}]' for j, good in enumerate(self.goods)) + '}'
                 for i, bidder in enumerate(self.bidders)
             ) + '\n'
             string += 'Payments:\n'
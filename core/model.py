@@ -1,10 +1,144 @@
+import json
+import os
+import sys
+import weakref
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.snapshot import SnapshotReader, SnapshotWriter
+
+
+def array_joint_trade(bidders, goods, trades):
+    """
+    Returns the non-zero entries of a bidders × goods NumPy trade matrix,
+    indexed by bidder and good names.
+    """
+    joint_trade = {str(bidder): {} for bidder in bidders}
+    rows, cols = np.nonzero(trades)
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        joint_trade[str(bidders[i])][str(goods[j])] = trades[i, j].item()
+    return joint_trade
+
+
+class SparseTrades:
+    """
+This class represents a sparse bidders × goods matrix of trades, stored as a
+dictionary of rows (bidder index → {good index: quantity}), so that its size
+only depends on the number of non-zero trades. Entries are read and written
+with `trades[i, j]`, where i and j can also be index arrays (reads then
+return a NumPy array of their broadcast shape).
+    """
+    __slots__ = ('shape', 'rows')
+
+    def __init__(self, n: int, m: int):
+        self.shape = (n, m)
+        self.rows = {}
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        Creates a sparse trade matrix from a dense one.
+        """
+        array = np.asarray(array)
+        trades = cls(*array.shape)
+        rows, cols = np.nonzero(array)
+        trades[rows, cols] = array[rows, cols]
+        return trades
+
+    @classmethod
+    def from_items(cls, n: int, m: int, rows, cols, quantities):
+        """
+        Creates an n × m sparse trade matrix from the NumPy arrays of the
+        bidder indices, good indices and quantities of its non-zero trades
+        (as listed by `items`), filling the rows directly rather than entry
+        by entry.
+        """
+        trades = cls(n, m)
+        for i, j, quantity in zip(np.asarray(rows).tolist(), np.asarray(cols).tolist(),
+                                  np.asarray(quantities).tolist()):
+            row = trades.rows.get(i)
+            if row is None:
+                row = trades.rows[i] = {}
+            row[j] = quantity
+        return trades
+
+    def __getitem__(self, key):
+        i, j = key
+        if np.ndim(i) or np.ndim(j):
+            i, j = np.broadcast_arrays(i, j)
+            quantities = [self.rows.get(bidder, {}).get(good, 0)
+                          for bidder, good in zip(i.ravel().tolist(), j.ravel().tolist())]
+            return np.array(quantities).reshape(i.shape)
+        return self.rows.get(int(i), {}).get(int(j), 0)
+
+    def __setitem__(self, key, quantity):
+        i, j = key
+        if np.ndim(i) or np.ndim(j) or np.ndim(quantity):
+            i, j, quantity = np.broadcast_arrays(i, j, quantity)
+            for i, j, q in zip(i.ravel().tolist(), j.ravel().tolist(), quantity.ravel().tolist()):
+                self._set(i, j, q)
+        else:
+            self._set(int(i), int(j), quantity.item() if isinstance(quantity, np.generic) else quantity)
+
+    def _set(self, i, j, quantity):
+        if quantity:
+            self.rows.setdefault(i, {})[j] = quantity
+        elif j in self.rows.get(i, ()):
+            del self.rows[i][j]
+            if not self.rows[i]:
+                del self.rows[i]
+
+    def row(self, i):
+        """
+        Returns the non-zero trades of the i-th bidder, as a dictionary
+        {good index: quantity} (which must not be modified).
+        """
+        return self.rows.get(i, {})
+
+    def items(self):
+        """
+        Iterates over the non-zero trades, as (bidder index, good index,
+        quantity) triples.
+        """
+        for i, row in self.rows.items():
+            for j, quantity in row.items():
+                yield i, j, quantity
+
+    def nnz(self):
+        """
+        Returns the number of non-zero trades.
+        """
+        return sum(len(row) for row in self.rows.values())
+
+    def toarray(self, dtype=None):
+        """
+        Returns the dense NumPy version of this matrix.
+        """
+        array = np.zeros(self.shape, dtype=dtype)
+        for i, j, quantity in self.items():
+            array[i, j] = quantity
+        return array
+
 
 class Bidder:
     """
 This class represents a bidder participating to an auction.
+Bidders are interned: creating a bidder with the name of an existing one
+returns the existing object.
     """
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ('name', '__weakref__')
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, name):
+        bidder = cls._instances.get(name)
+        if bidder is None:
+            bidder = super().__new__(cls)
+            bidder.name = sys.intern(name) if type(name) == str else name
+            cls._instances[name] = bidder
+        return bidder
+
+    def __reduce__(self):
+        return (type(self), (self.name,))
 
     def __str__(self):
         return self.name
@@ -13,9 +147,22 @@ This class represents a bidder participating to an auction.
 class GoodType:
     """
 This class represents a good type involved in an auction.
+Good types are interned: creating a good type with the name of an existing
+one returns the existing object.
     """
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ('name', '__weakref__')
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, name):
+        good = cls._instances.get(name)
+        if good is None:
+            good = super().__new__(cls)
+            good.name = sys.intern(name) if type(name) == str else name
+            cls._instances[name] = good
+        return good
+
+    def __reduce__(self):
+        return (type(self), (self.name,))
 
     def __str__(self):
         return self.name
@@ -25,7 +172,23 @@ class Auction:
     """
     This class represents a general auction. Must be extended to describe precise auctions.
     """
-    def __init__(self, name: str, bidders: list[Bidder], goods: list[GoodType]):
+    # Kind of the auction in its snapshots (see `to_snapshot`), set by every concrete subclass.
+    # It must never change, so that the snapshots taken before a refactoring can still be read.
+    snapshot_kind = None
+    _snapshot_classes = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'snapshot_kind' in cls.__dict__:
+            Auction._snapshot_classes[cls.snapshot_kind] = cls
+
+    def __init__(self, name: str, bidders: list[Bidder], goods: list[GoodType],
+                 payment_dtype=np.float64):
+        """
+        Creates an auction. Trades are stored in a sparse bidders × goods
+        matrix (see `SparseTrades`) and payments in a NumPy vector, whose type
+        is given by payment_dtype.
+        """
         self.name = name
         self.bidders = bidders
         self.bidder_idx = {bidder.name: idx for idx, bidder in enumerate(bidders)}
@@ -33,9 +196,15 @@ class Auction:
         self.good_idx = {good.name: idx for idx, good in enumerate(goods)}
         self.n = len(bidders)
         self.m = len(goods)
-        self.trades = [[0 for _ in self.goods] for _ in self.bidders]
-        self.payments = [0 for _ in self.bidders]
+        self.trades = SparseTrades(self.n, self.m)
+        self.payments = np.zeros(self.n, dtype=payment_dtype)
         self.terminated = False
+        # Cached state (see `state`) and the bidders and goods touched since it was computed
+        self._state = None
+        self._state_json = None
+        self._dirty = True
+        self._dirty_bidders = set()
+        self._dirty_goods = set()
 
     def does(self, action):
         """
@@ -69,12 +238,156 @@ class Auction:
         """
         Returns the total price that the bidder has to pay.
         """
-        return self.payments[self.get_bidder_idx(bidder)]
+        return self._payment(self.get_bidder_idx(bidder))
 
     def state(self):
         """
         Returns a JSON representation of the auction state.
         Useful for the auction server.
+        The state is cached and kept up to date incrementally: only the entries
+        of the bidders and goods touched (see `_touch`) since the last call are
+        recomputed. The returned dictionary must therefore not be modified.
+        """
+        if self._state is None:
+            self._state = {
+                "joint_trade": {},
+                "joint_allocation": {},
+                "joint_payment": {},
+                "propositions": None
+            }
+            self._dirty_bidders = set(range(self.n))
+            self._dirty_goods = set(range(self.m))
+            self._dirty = True
+        joint_trade = self._state["joint_trade"]
+        joint_allocation = self._state["joint_allocation"]
+        joint_payment = self._state["joint_payment"]
+        for i in sorted(self._dirty_bidders):
+            bidder = str(self.bidders[i])
+            joint_trade[bidder] = self._trade_row(i)
+            joint_allocation[bidder] = self._allocation_row(i, joint_trade[bidder])
+            payment = self._payment(i)
+            if payment:
+                joint_payment[bidder] = payment
+            else:
+                joint_payment.pop(bidder, None)
+        if self._dirty:
+            self._state["propositions"] = self._propositions(self._state["propositions"],
+                                                             sorted(self._dirty_goods))
+        self._dirty = False
+        self._dirty_bidders = set()
+        self._dirty_goods = set()
+        return self._state
+
+    def state_json(self):
+        """
+        Returns the JSON serialization of `state`. It is cached until the next
+        change of the auction state.
+        """
+        if self._state_json is None:
+            self._state_json = json.dumps(self.state())
+        return self._state_json
+
+    def to_snapshot(self, compress: bool = True) -> bytes:
+        """
+        Returns a compact binary encoding of this auction (see
+        `core.snapshot`), compressed with zlib if compress is True, from
+        which `from_snapshot` creates an identical auction. Unlike a pickle,
+        it only depends on the kind of the auction and on the fields written
+        by `_write_snapshot`, not on the classes and modules implementing it.
+        The cached JSON state (see `state_json`) is kept.
+        """
+        writer = SnapshotWriter()
+        writer.string(self.name)
+        writer.strings([bidder.name for bidder in self.bidders])
+        writer.strings([good.name for good in self.goods])
+        rows, cols, quantities = zip(*self.trades.items()) if self.trades.nnz() else ((), (), ())
+        writer.array(np.array(rows, dtype=np.int64))
+        writer.array(np.array(cols, dtype=np.int64))
+        writer.array(np.array(quantities, dtype=None if quantities else np.int64))
+        writer.array(self.payments)
+        writer.boolean(self.terminated)
+        writer.value(self._state_json)
+        self._write_snapshot(writer)
+        return writer.getvalue(self.snapshot_kind, compress)
+
+    @classmethod
+    def from_snapshot(cls, data: bytes) -> 'Auction':
+        """
+        Creates an auction from its snapshot (see `to_snapshot`). The class of
+        the auction is given by the kind recorded in the snapshot, and must be
+        this class or one of its subclasses.
+        Raises ValueError if the data is not the snapshot of such an auction.
+        """
+        reader = SnapshotReader(data)
+        auction_class = Auction._snapshot_classes.get(reader.kind)
+        if auction_class is None or not issubclass(auction_class, cls):
+            raise ValueError(f'Not the snapshot of a {cls.__name__}: {reader.kind}')
+        auction = auction_class.__new__(auction_class)
+        name = reader.string()
+        bidders = [Bidder(bidder) for bidder in reader.strings()]
+        goods = [GoodType(good) for good in reader.strings()]
+        rows, cols, quantities = reader.array(), reader.array(), reader.array()
+        payments = reader.array()
+        Auction.__init__(auction, name, bidders, goods, payments.dtype)
+        auction.trades = SparseTrades.from_items(auction.n, auction.m, rows, cols, quantities)
+        auction.payments = payments
+        auction.terminated = reader.boolean()
+        auction._state_json = reader.value()
+        auction._read_snapshot(reader)
+        return auction
+
+    def _write_snapshot(self, writer: SnapshotWriter) -> None:
+        """
+        Writes the fields specific to this kind of auction to its snapshot.
+        Should be defined in subclasses.
+        """
+        raise NotImplementedError
+
+    def _read_snapshot(self, reader: SnapshotReader) -> None:
+        """
+        Reads back the fields written by `_write_snapshot` (reader.version is
+        the format version of the snapshot). Should be defined in subclasses.
+        """
+        raise NotImplementedError
+
+    def _touch(self, bidders=(), goods=()):
+        """
+        Records that the trades or payments of the given bidders, and the
+        propositions about the given goods, have changed. Should be called by
+        subclasses whenever they change the auction state (with no argument if
+        only global propositions, e.g. the current price, have changed).
+        """
+        self._dirty = True
+        self._dirty_bidders.update(bidders)
+        self._dirty_goods.update(goods)
+        self._state_json = None
+
+    def _trade_row(self, i):
+        """
+        Returns the non-zero trades of the i-th bidder, indexed by good names.
+        """
+        trades = self.trades.row(i)
+        return {str(self.goods[j]): trades[j] for j in sorted(trades)}
+
+    def _payment(self, i):
+        """
+        Returns the payment of the i-th bidder as a Python number.
+        """
+        return self.payments[i].item()
+
+    def _allocation_row(self, i, trade_row):
+        """
+        Returns the allocation of the i-th bidder, indexed by good names.
+        By default, the allocation is the trade.
+        """
+        return trade_row
+
+    def _propositions(self, propositions, goods):
+        """
+        Returns the "propositions" part of the state. propositions is the
+        previous value (None if it must be built from scratch) and goods
+        the indices of the goods touched since then. Should be defined in
+        subclasses.
         """
         raise NotImplementedError
 
@@ -98,4 +411,4 @@ class Auction:
         Gets the good index given the good id. (This is a good id...)
         """
         good = good.name if type(good) == GoodType else good
-        return self.good_idx[good]
\ No newline at end of file
+        return self.good_idx[good]
@@ -1,5 +1,6 @@
 import os
 import sys
+import numpy as np
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from core.model import Auction, Bidder, GoodType
@@ -10,14 +11,29 @@ This class represents the simultaneous ascending auction mechanism. This
 mechanism is similar to the traditional English auction, except that
 several items are sold simultaneously.
     """
-    def __init__(self, bidders: list[Bidder], goods: list[GoodType], start_price, increment):
-        super().__init__("Simultaneous Ascending Auction", bidders, goods)
+    snapshot_kind = 'SAA'
+
+    def __init__(self, bidders: list[Bidder], goods: list[GoodType], start_price, increment,
+                 vectorized: bool = False):
+        """
+        Creates an auction. If vectorized is True, the bids are stored as a
+        bidders × goods boolean matrix, and the sold goods and sold prices
+        as vectors, so that each round is cleared with a few NumPy reductions.
+        """
+        price_type = np.result_type(start_price, increment)
+        super().__init__("Simultaneous Ascending Auction", bidders, goods, payment_dtype=price_type)
         self.increment = increment
         self.price = start_price
         self.start_price = start_price
-        self.sold_prices = [None for _ in self.goods]
-        self.bids = [set() for _ in self.goods]
-        self.sold = [False for _ in self.goods]
+        self.vectorized = vectorized
+        if vectorized:
+            self.sold_prices = np.zeros(self.m, dtype=price_type)
+            self.bids = np.zeros((self.n, self.m), dtype=bool)
+            self.sold = np.zeros(self.m, dtype=bool)
+        else:
+            self.sold_prices = [None for _ in self.goods]
+            self.bids = [set() for _ in self.goods]
+            self.sold = [False for _ in self.goods]
 
     def does(self, bidder, action):
         """
@@ -34,6 +50,9 @@ several items are sold simultaneously.
             if type(goods) != list:
                 goods = [goods]
             goods = [self.get_good_idx(good) for good in goods]
+            if self.vectorized:
+                self.bids[bidder, goods] = True
+                return
             for good in goods:
                 self.bids[good].add(bidder)
 
@@ -56,12 +75,74 @@ several items are sold simultaneously.
             and not self.is_terminated() \
             and all(not self.sold[good] for good in goods)
 
+    def apply_bid(self, bidder: int, goods) -> bool:
+        """
+        Checks and executes in one step a bid given with indices, bypassing the
+        name lookups of `is_legal` and `does`. bidder is a bidder index and goods
+        either an array of good indices or a boolean mask over the goods.
+        Returns True if and only if the bid is legal (see `is_legal`).
+        An illegal bid is ignored, i.e. considered as 'noop'.
+        """
+        goods = np.asarray(goods)
+        if goods.dtype == bool:
+            if goods.shape != (self.m,):
+                return False
+            goods = np.flatnonzero(goods)
+        else:
+            # Good indices (np.asarray gives an empty list a float type); non-integral ones are illegal
+            try:
+                indices = np.asarray(goods, dtype=np.intp)
+            except (TypeError, ValueError):
+                return False
+            if not np.array_equal(indices, goods):
+                return False
+            goods = indices
+        if self.terminated or not 0 <= bidder < self.n \
+                or (goods.size and (goods.min() < 0 or goods.max() >= self.m)):
+            return False
+        if self.vectorized:
+            if self.sold[goods].any():
+                return False
+            self.bids[bidder, goods] = True
+            return True
+        goods = goods.tolist()
+        if any(self.sold[good] for good in goods):
+            return False
+        for good in goods:
+            self.bids[good].add(bidder)
+        return True
+
+    def apply_bids(self, bidders, goods):
+        """
+        Checks and executes the bids of several bidders at once. bidders is an
+        array of bidder indices and goods a len(bidders) × goods boolean matrix
+        whose rows are the goods each of these bidders bids for.
+        Returns a boolean array telling which bids were legal (the illegal
+        ones are ignored).
+        """
+        bidders = np.asarray(bidders, dtype=np.int64)
+        goods = np.asarray(goods, dtype=bool).reshape(len(bidders), self.m)
+        if self.terminated:
+            return np.zeros(len(bidders), dtype=bool)
+        legal = (bidders >= 0) & (bidders < self.n) & ~(goods & np.asarray(self.sold)).any(axis=1)
+        if self.vectorized:
+            np.logical_or.at(self.bids, bidders[legal], goods[legal])
+        else:
+            for bidder, row in zip(bidders[legal].tolist(), goods[legal]):
+                for good in np.flatnonzero(row).tolist():
+                    self.bids[good].add(bidder)
+        return legal
+
     def next(self):
         """
         Computes the next state.
         """
         if self.terminated:
             return
+        self._touch()
+        if self.vectorized:
+            self._next_vectorized()
+            return
         self.terminated = True
         for j in range(self.m):
             if not self.sold[j]:
@@ -69,43 +150,181 @@ several items are sold simultaneously.
                     self.terminated = False
                 if len(self.bids[j]) == 1:
                     winner = next(iter(self.bids[j]))
-                    self.trades[winner][j] = 1
+                    self.trades[winner, j] = 1
                     self.sold[j] = True
                     self.sold_prices[j] = self.price
                     self.payments[winner] += self.price
+                    self._touch([winner], [j])
                 self.bids[j] = set()
         self.terminated = self.terminated or all(self.sold)
         self.price += self.increment
 
-    def state(self):
+    def _next_vectorized(self):
         """
-        Returns a JSON representation of the auction state.
-        Useful for the auction server.
+        Computes the next state when bids are stored as a boolean matrix.
+        A good is sold as soon as exactly one bidder bids for it.
         """
-        auction_state = {}
-        auction_state["joint_trade"] = {
-            str(bidder): {
-                str(good): self.trades[i][j]
-                for j, good in enumerate(self.goods)
-                if self.trades[i][j]
-            }
-            for i, bidder in enumerate(self.bidders)
-            }
-        auction_state["joint_allocation"] = auction_state["joint_trade"]
-        auction_state["joint_payment"] = {
-            str(bidder): self.payments[j]
-            for j, bidder in enumerate(self.bidders)
-            if self.payments[j]
-            }
-        auction_state["propositions"] = {
-            "terminated": self.terminated,
-            "price": self.price,
-            "start_price": self.start_price,
-            "increment": self.increment,
-            "sold_prices": self.sold_prices,
-            "sold": self.sold
-            }
-        return auction_state
+        nb_bids = np.count_nonzero(self.bids, axis=0)
+        nb_bids[self.sold] = 0
+        self.terminated = not nb_bids.any()
+        goods = np.flatnonzero(nb_bids == 1)
+        if goods.size:
+            self._sell(goods, self.bids[:, goods].argmax(axis=0))
+        self.bids[:] = False
+        self.terminated = self.terminated or bool(self.sold.all())
+        self.price += self.increment
+
+    def run_proxy(self, limits):
+        """
+        Runs the auction until termination on behalf of proxy bidders.
+        limits maps bidders to their maximum price for each good
+        ({bidder: {good: max_price}}). At each round, every proxy bids for
+        the unsold goods whose current price does not exceed its limit.
+        Bidders missing from limits never bid.
+        """
+        if self.vectorized:
+            max_prices = np.full((self.n, self.m), -np.inf)
+            for bidder, goods in limits.items():
+                bidder = self.get_bidder_idx(bidder)
+                for good, max_price in goods.items():
+                    max_prices[bidder, self.get_good_idx(good)] = max_price
+            while not self.terminated:
+                self.bids |= (max_prices >= self.price) & ~self.sold
+                self.next()
+            return
+        while not self.terminated:
+            for bidder, goods in limits.items():
+                self.does(bidder, [good for good, max_price in goods.items()
+                                   if max_price >= self.price
+                                   and not self.sold[self.get_good_idx(good)]])
+            self.next()
+
+    def solve_truthful(self, values):
+        """
+        Computes in closed form the outcome of the auction when every bidder
+        is truthful, i.e. bids at each round for every unsold good it values
+        at least the current price, and returns the final state (the same as
+        running `next` until termination). values is a bidders × goods array.
+        Must be called before the first round.
+        A bidder with value v bids for a good during the first
+        (v - start_price) // increment + 1 rounds. A good is sold to the bidder
+        bidding for the most rounds, as soon as it remains the only one (i.e.
+        at the round where the second best bidder stops), unless the two best
+        bidders stop at the same round (in which case the good is not sold).
+        """
+        values = np.asarray(values).reshape(self.n, self.m)
+        rounds = np.where(values >= self.start_price,
+                          (values - self.start_price) // self.increment + 1, 0).astype(np.int64)
+        if self.n > 1:
+            top_two = -np.partition(-rounds, 1, axis=0)[:2]
+            first, second = top_two[0], top_two[1]
+        else:
+            first, second = rounds.reshape(self.m), np.zeros(self.m, dtype=np.int64)
+        sold = first > second
+        goods = np.flatnonzero(sold)
+        winners = rounds[:, goods].argmax(axis=0)
+        # Number of rounds during which each good receives bids
+        active_rounds = np.where(sold, second + 1, first)
+        if sold.all():
+            last_round = int(active_rounds.max()) - 1 if self.m else 0
+        else:
+            last_round = int(active_rounds.max())
+        prices = [self.start_price + int(t) * self.increment for t in second[goods]]
+        if self.vectorized:
+            self.trades[winners, goods] = 1
+            self.sold[goods] = True
+            self.sold_prices[goods] = prices
+            np.add.at(self.payments, winners, prices)
+        else:
+            for winner, good, price in zip(winners.tolist(), goods.tolist(), prices):
+                self.trades[winner, good] = 1
+                self.sold[good] = True
+                self.sold_prices[good] = price
+                self.payments[winner] += price
+        self.price = self.start_price + (last_round + 1) * self.increment
+        self.terminated = True
+        self._touch(winners.tolist(), goods.tolist())
+        return self.state()
+
+    def _sell(self, goods, winners):
+        """
+        Sells the given goods (index array) to the given winners (index array)
+        at the current price.
+        """
+        self.trades[winners, goods] = 1
+        self.sold[goods] = True
+        self.sold_prices[goods] = self.price
+        np.add.at(self.payments, winners, self.price)
+        self._touch(winners.tolist(), goods.tolist())
+
+    def _propositions(self, propositions, goods):
+        """
+        Returns the "propositions" part of the state, only updating the
+        entries of the given goods if the previous propositions are given.
+        """
+        if propositions is None:
+            goods = range(self.m)
+            propositions = {
+                "terminated": self.terminated,
+                "price": self.price,
+                "start_price": self.start_price,
+                "increment": self.increment,
+                "sold_prices": [None for _ in self.goods],
+                "sold": [False for _ in self.goods]
+                }
+        propositions["terminated"] = self.terminated
+        propositions["price"] = self.price
+        for j in goods:
+            sold = bool(self.sold[j])
+            propositions["sold"][j] = sold
+            if self.vectorized:
+                propositions["sold_prices"][j] = self.sold_prices[j].item() if sold else None
+            else:
+                propositions["sold_prices"][j] = self.sold_prices[j]
+        return propositions
+
+    def _write_snapshot(self, writer):
+        """
+        Writes the prices, the sold goods and the current bids to a snapshot.
+        """
+        writer.values([self.start_price, self.increment, self.price])
+        writer.boolean(self.vectorized)
+        if self.vectorized:
+            writer.array(self.sold_prices)
+            writer.array(self.bids)
+            writer.array(self.sold)
+            return
+        writer.values(self.sold_prices)
+        writer.values(self.sold)
+        # The bidders of every good, concatenated, in iteration order (which gives the same sets back)
+        writer.array(np.array([len(bids) for bids in self.bids], dtype=np.int64))
+        writer.array(np.array([bidder for bids in self.bids for bidder in bids], dtype=np.min_scalar_type(self.n)))
+
+    def _read_snapshot(self, reader):
+        """
+        Reads back the fields written by `_write_snapshot`.
+        """
+        self.start_price, self.increment, self.price = reader.values()
+        self.vectorized = reader.boolean()
+        if self.vectorized:
+            self.sold_prices = reader.array()
+            self.bids = reader.array()
+            self.sold = reader.array()
+            return
+        self.sold_prices = reader.values()
+        self.sold = reader.values()
+        sizes, bidders = reader.array(), reader.array().tolist()
+        ends = np.cumsum(sizes).tolist()
+        self.bids = [set(bidders[end - size:end]) for size, end in zip(sizes.tolist(), ends)]
+
+    def bidders_on(self, good):
+        """
+        Returns the indices of the bidders currently bidding for the given good
+        (given by its index).
+        """
+        if self.vectorized:
+            return np.flatnonzero(self.bids[:, good]).tolist()
+        return self.bids[good]
 
     def pretty(self):
         """
@@ -120,7 +339,7 @@ several items are sold simultaneously.
         string += '\n'.join(
             str(bidder) + ' bought {'
             + ', '.join(str(good) + f' (€{self.sold_prices[j]})'
-                        for j, good in enumerate(self.goods) if self.trades[i][j]) + '}'
+                        for j, good in enumerate(self.goods) if self.trades[i, j]) + '}'
             + f' for €{self.payments[i]}'
             for i, bidder in enumerate(self.bidders)
             ) + '\n'
@@ -131,7 +350,7 @@ several items are sold simultaneously.
             string += '\nCurrent bids:\n'
             string += '\n'.join(
                 str(good) + ' → {'
-                + ', '.join(str(self.bidders[bidder]) for bidder in self.bids[j]) + '}'
+                + ', '.join(str(self.bidders[bidder]) for bidder in self.bidders_on(j)) + '}'
                 for j, good in enumerate(self.goods)
                 if not self.sold[j])
         return string
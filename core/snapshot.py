@@ -0,0 +1,226 @@
+import functools
+import json
+import math
+import struct
+import zlib
+import numpy as np
+
+# Header of a snapshot: magic number, format version, flags and kind of
+# auction (see `core.model.Auction.to_snapshot`)
+MAGIC = b'GASP'
+VERSION = 1
+COMPRESSED = 1
+
+_HEADER = struct.Struct('<4sHB')
+_INT = struct.Struct('<q')
+_UINT = struct.Struct('<I')
+_FLOAT = struct.Struct('<d')
+
+# Tags of the scalars written by `SnapshotWriter.value`
+_NONE, _FALSE, _TRUE, _INTEGER, _FLOAT_TAG, _STRING, _BIG_INTEGER = range(7)
+
+
+class SnapshotWriter:
+    """
+This class builds the binary encoding of an auction state: a sequence of
+fields written in a fixed order by the auction classes, and read back in the
+same order by a `SnapshotReader`. Integers and floats are packed with
+`struct`, NumPy arrays are stored as their raw little-endian bytes, and the
+scalars whose type may vary (e.g. prices, which are integers or floats, or
+None) are tagged (see `value`).
+    """
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def integer(self, value: int) -> None:
+        self.buffer += _INT.pack(value)
+
+    def real(self, value: float) -> None:
+        self.buffer += _FLOAT.pack(value)
+
+    def boolean(self, value: bool) -> None:
+        self.buffer.append(1 if value else 0)
+
+    def string(self, value: str) -> None:
+        data = value.encode('utf-8')
+        self.buffer += _UINT.pack(len(data))
+        self.buffer += data
+
+    def strings(self, values) -> None:
+        self.json(list(values))
+
+    def value(self, value) -> None:
+        """
+        Writes a tagged scalar: None, a boolean, an integer, a float or a
+        string (NumPy scalars are written as the Python ones).
+        """
+        if isinstance(value, np.generic):
+            value = value.item()
+        if value is None:
+            self.buffer.append(_NONE)
+        elif isinstance(value, bool):
+            self.buffer.append(_TRUE if value else _FALSE)
+        elif isinstance(value, int):
+            if -2 ** 63 <= value < 2 ** 63:
+                self.buffer.append(_INTEGER)
+                self.integer(value)
+            else:
+                self.buffer.append(_BIG_INTEGER)
+                self.string(str(value))
+        elif isinstance(value, float):
+            self.buffer.append(_FLOAT_TAG)
+            self.real(value)
+        elif isinstance(value, str):
+            self.buffer.append(_STRING)
+            self.string(value)
+        else:
+            raise TypeError(f'Cannot write a {type(value).__name__} in a snapshot')
+
+    def values(self, values) -> None:
+        """
+        Writes a list of scalars (None, booleans, integers, floats or strings,
+        including NumPy scalars) as a JSON array, which keeps their types.
+        """
+        self.json(list(values))
+
+    def array(self, array) -> None:
+        """
+        Writes a NumPy array of numbers or booleans, with its type and shape.
+        """
+        array = np.asarray(array)
+        if array.dtype.kind not in 'biuf':
+            raise TypeError(f'Cannot write an array of {array.dtype} in a snapshot')
+        dtype = array.dtype.newbyteorder('<') if array.dtype.byteorder == '>' else array.dtype
+        self.string(dtype.str)
+        self.buffer.append(array.ndim)
+        self.buffer += struct.pack(f'<{array.ndim}q', *array.shape)
+        self.buffer += np.ascontiguousarray(array, dtype=dtype).tobytes()
+
+    def json(self, value) -> None:
+        """
+        Writes a JSON-serializable value (e.g. a configuration dictionary).
+        """
+        self.string(json.dumps(value, default=_item))
+
+    def getvalue(self, kind: str, compress: bool = True) -> bytes:
+        """
+        Returns the snapshot: header, kind of auction and the fields written
+        so far, compressed with zlib if compress is True.
+        """
+        body = bytes(self.buffer)
+        if compress:
+            body = zlib.compress(body, 1)
+        kind = kind.encode('utf-8')
+        return _HEADER.pack(MAGIC, VERSION, COMPRESSED if compress else 0) + \
+            bytes([len(kind)]) + kind + body
+
+
+class SnapshotReader:
+    """
+This class reads back the fields of a snapshot written by a `SnapshotWriter`.
+The header is read when the reader is created: `version` is the format
+version of the snapshot, and `kind` the kind of auction it contains.
+Raises ValueError if the data is not a snapshot, a corrupt or truncated
+one, or a snapshot of a newer format version.
+    """
+    def __init__(self, data: bytes) -> None:
+        data = bytes(data)
+        if len(data) < _HEADER.size + 1 or not is_snapshot(data):
+            raise ValueError('Not an auction snapshot')
+        _, self.version, flags = _HEADER.unpack_from(data)
+        if self.version > VERSION:
+            raise ValueError(f'Snapshot format version {self.version} is newer than {VERSION}')
+        size = data[_HEADER.size]
+        start = _HEADER.size + 1
+        self.kind = data[start:start + size].decode('utf-8')
+        body = data[start + size:]
+        if flags & COMPRESSED:
+            try:
+                body = zlib.decompress(body)
+            except zlib.error as e:
+                raise ValueError(f'Corrupt auction snapshot: {e}') from e
+        self.data = memoryview(body)
+        self.offset = 0
+
+    def _unpack(self, format: struct.Struct):
+        return format.unpack(self._bytes(format.size))[0]
+
+    def _bytes(self, size: int) -> memoryview:
+        if self.offset + size > len(self.data):
+            raise ValueError('Truncated auction snapshot')
+        data = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return data
+
+    def integer(self) -> int:
+        return self._unpack(_INT)
+
+    def real(self) -> float:
+        return self._unpack(_FLOAT)
+
+    def boolean(self) -> bool:
+        return bool(self._bytes(1)[0])
+
+    def string(self) -> str:
+        return str(self._bytes(self._unpack(_UINT)), 'utf-8')
+
+    def strings(self) -> list:
+        return self.json()
+
+    def value(self):
+        tag = self._bytes(1)[0]
+        if tag == _NONE:
+            return None
+        if tag in (_FALSE, _TRUE):
+            return tag == _TRUE
+        if tag == _INTEGER:
+            return self.integer()
+        if tag == _FLOAT_TAG:
+            return self.real()
+        if tag == _STRING:
+            return self.string()
+        if tag == _BIG_INTEGER:
+            return int(self.string())
+        raise ValueError(f'Unknown value tag {tag} in an auction snapshot')
+
+    def values(self) -> list:
+        return self.json()
+
+    def array(self) -> np.ndarray:
+        try:
+            dtype = _dtype(self.string())
+        except TypeError as e:
+            raise ValueError(f'Corrupt auction snapshot: {e}') from e
+        ndim = self._bytes(1)[0]
+        shape = struct.unpack_from(f'<{ndim}q', self._bytes(8 * ndim))
+        # A copy, so that the array is writable and does not keep the snapshot alive
+        return np.frombuffer(self._bytes(dtype.itemsize * math.prod(shape)), dtype=dtype).reshape(shape).copy()
+
+    def json(self):
+        return json.loads(self.string())
+
+
+def _item(value):
+    """
+    Converts the NumPy scalars that the json module cannot serialize.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Cannot write a {type(value).__name__} in a snapshot')
+
+
+@functools.lru_cache(maxsize=None)
+def _dtype(name: str) -> np.dtype:
+    """
+    Returns the NumPy type of the given name (cached, since there are only a
+    few of them in the snapshots).
+    """
+    return np.dtype(name)
+
+
+def is_snapshot(data: bytes) -> bool:
+    """
+    Returns True if and only if the given data starts like a snapshot (rather
+    than, e.g., a pickle).
+    """
+    return bytes(data[:len(MAGIC)]) == MAGIC
@@ -0,0 +1,275 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.model import Auction, Bidder, GoodType
+from core.snapshot import SnapshotReader, SnapshotWriter
+from core.winner_determination import top_two_prices, top_k_prices
+
+
+class PricingRule:
+    """
+This class represents the payment rule of a sealed bid auction. A pricing
+rule is called with the bidders × goods matrix of the submitted prices
+(NaN meaning "no bid") and returns the vector of the prices at which the
+goods are sold to their highest bidders (NaN meaning "not sold").
+Must be extended to describe precise rules.
+    """
+    def __call__(self, prices):
+        raise NotImplementedError
+
+
+class FirstPrice(PricingRule):
+    """
+A good is sold at its highest bid, provided this bid is positive.
+    """
+    def __call__(self, prices):
+        highest = top_k_prices(prices, 1)[0]
+        return np.where(highest > 0, highest, np.nan)
+
+
+class SecondPrice(PricingRule):
+    """
+A good is sold to its highest bidder, provided the highest bid is positive,
+at the highest price strictly lower than the highest bid. If there is no
+such positive price, the good is sold at its highest bid.
+    """
+    def __call__(self, prices):
+        _, highest, second = top_two_prices(prices)
+        return np.where(highest > 0, np.where(second > 0, second, highest), np.nan)
+
+
+class KthPrice(PricingRule):
+    """
+A good is sold to its highest bidder, provided the highest bid is positive,
+at its k-th highest bid. If there are less than k bids or the k-th bid is not
+positive, the good is sold at its highest bid. k must be at least 1.
+    """
+    def __init__(self, k: int):
+        if k < 1:
+            raise ValueError(f'k must be at least 1, not {k}')
+        self.k = k
+
+    def __call__(self, prices):
+        top = top_k_prices(prices, self.k)
+        highest, kth = top[0], top[-1]
+        return np.where(highest > 0, np.where(kth > 0, kth, highest), np.nan)
+
+
+class ReservePrice(PricingRule):
+    """
+Adds a reserve price (either the same for every good, or one per good) to
+another pricing rule: a good whose highest bid is lower than its reserve
+price is not sold, and a good is never sold below its reserve price. A good
+that the other rule does not sell is not sold either.
+    """
+    def __init__(self, rule: PricingRule, reserve):
+        self.rule = rule
+        self.reserve = reserve
+
+    def __call__(self, prices):
+        sold_prices = self.rule(prices)
+        highest = top_k_prices(prices, 1)[0]
+        # The reserve price only narrows the goods sold by the pricing rule
+        return np.where((highest >= self.reserve) & ~np.isnan(sold_prices),
+                        np.fmax(sold_prices, self.reserve), np.nan)
+
+
+def _write_pricing(writer: SnapshotWriter, pricing: PricingRule) -> None:
+    """
+    Writes a pricing rule to an auction snapshot, with a tag that does not
+    depend on the name of its class.
+    """
+    if isinstance(pricing, ReservePrice):
+        writer.string('RESERVE')
+        _write_pricing(writer, pricing.rule)
+        writer.boolean(np.ndim(pricing.reserve) > 0)
+        if np.ndim(pricing.reserve) > 0:
+            writer.array(pricing.reserve)
+        else:
+            writer.value(pricing.reserve)
+    elif isinstance(pricing, KthPrice):
+        writer.string('KTH')
+        writer.integer(pricing.k)
+    elif isinstance(pricing, SecondPrice):
+        writer.string('SECOND')
+    elif isinstance(pricing, FirstPrice):
+        writer.string('FIRST')
+    else:
+        raise TypeError(f'Cannot write the pricing rule {type(pricing).__name__} in a snapshot')
+
+
+def _read_pricing(reader: SnapshotReader) -> PricingRule:
+    """
+    Reads back a pricing rule written by `_write_pricing`.
+    """
+    tag = reader.string()
+    if tag == 'RESERVE':
+        rule = _read_pricing(reader)
+        return ReservePrice(rule, reader.array() if reader.boolean() else reader.value())
+    if tag == 'KTH':
+        return KthPrice(reader.integer())
+    if tag == 'SECOND':
+        return SecondPrice()
+    if tag == 'FIRST':
+        return FirstPrice()
+    raise ValueError(f'Unknown pricing rule {tag} in an auction snapshot')
+
+
+class SSBAuction(Auction):
+    '''
+    This class represents the simultaneous sealed bid auction mechanism. This
+    mechanism is similar to the traditional sealed bid auction, except that
+    several items are sold simultaneously. Each good is sold to its highest
+    bidder (the first one in case of a tie), at a price given by a pricing rule
+    (see `PricingRule`).
+    The bids are stored in a bidders × goods price matrix, so that all the goods
+    are cleared at once.
+    '''
+    snapshot_kind = 'SSBA'
+
+    def __init__(self, bidders: list[Bidder], goods: list[GoodType],
+                 pricing: PricingRule = None, name: str = "Simultaneous Sealed Bid Auction"):
+        super().__init__(name, bidders, goods)
+        self.pricing = FirstPrice() if pricing is None else pricing
+        self.sold_prices = [None for _ in self.goods]
+        self.bids = np.full((self.n, self.m), np.nan)
+        self.sold = [False for _ in self.goods]
+
+    def does(self, bidder, action):
+        '''
+        Executes the given action for the given bidder.
+        Here, we consider that an action is a dictionary mapping goods to prices,
+        indicating that the given bidder bids for the given good(s) with a price for each.
+        In this case, the action is always legal since it is an one-shot auction (cf. `is_legal`),
+        and it simply records the bid (replacing any previous bid of this bidder for the same goods).
+        '''
+        if action != 'noop':
+            bidder = self.get_bidder_idx(bidder)
+            goods = [self.get_good_idx(good) for good in action.keys()]
+            self.bids[bidder, goods] = list(action.values())
+
+    def is_legal(self, action):
+        '''
+        Evaluates whether the given action is legal or not.
+        Here, we consider that an action is a pair (bidder, {good: price})
+        indicating that the given bidder bids for the given goods.
+        This action is always in a one-shot auction.
+        '''
+        bidder, offer = action
+        bidder = self.get_bidder_idx(bidder)
+        goods = [self.get_good_idx(good) for good in offer.keys()]
+        return bidder >= 0 and bidder < len(self.bidders) \
+            and all(good >= 0 and good < len(self.goods) for good in goods) \
+            and not self.is_terminated() \
+            and all(not self.sold[good] for good in goods)
+
+    def apply_bids(self, bidders, prices):
+        '''
+        Checks and executes the bids of several bidders at once, given with
+        indices, bypassing the name lookups of `is_legal` and `does`. bidders is
+        an array of bidder indices and prices a len(bidders) × goods matrix of
+        the prices offered by these bidders (NaN meaning "no bid").
+        Returns a boolean array telling which bids were legal (the illegal
+        ones are ignored).
+        '''
+        bidders = np.asarray(bidders, dtype=np.int64)
+        prices = np.asarray(prices, dtype=float).reshape(len(bidders), self.m)
+        if self.terminated:
+            return np.zeros(len(bidders), dtype=bool)
+        offers = ~np.isnan(prices)
+        legal = (bidders >= 0) & (bidders < self.n) & ~(offers & np.asarray(self.sold)).any(axis=1)
+        rows, goods = np.nonzero(offers & legal[:, None])
+        self.bids[bidders[rows], goods] = prices[rows, goods]
+        return legal
+
+    def next(self):
+        '''
+        Computes the next--and final--state.
+        '''
+        if self.terminated:
+            return
+        sold_prices = self.pricing(self.bids)
+        goods = np.flatnonzero(~np.isnan(sold_prices))
+        winners = np.where(np.isnan(self.bids[:, goods]), -np.inf, self.bids[:, goods]).argmax(axis=0)
+        for winner, j, price in zip(winners.tolist(), goods.tolist(), sold_prices[goods].tolist()):
+            # Prices are stored as floats in the bid matrix
+            price = int(price) if price.is_integer() else price
+            self.trades[winner, j] = 1
+            self.sold[j] = True
+            self.sold_prices[j] = price
+            self.payments[winner] += price
+        self.bids[:] = np.nan
+        self.terminated = True
+        self._touch(winners.tolist(), goods.tolist())
+
+    def _payment(self, i):
+        """
+        Returns the payment of the i-th bidder, as an integer if it is integral
+        (prices are stored as floats).
+        """
+        payment = self.payments[i].item()
+        return int(payment) if payment.is_integer() else payment
+
+    def _write_snapshot(self, writer):
+        """
+        Writes the pricing rule, the sold goods and the current bids to a
+        snapshot.
+        """
+        _write_pricing(writer, self.pricing)
+        writer.values(self.sold_prices)
+        writer.values(self.sold)
+        writer.array(self.bids)
+
+    def _read_snapshot(self, reader):
+        """
+        Reads back the fields written by `_write_snapshot`.
+        """
+        self.pricing = _read_pricing(reader)
+        self.sold_prices = reader.values()
+        self.sold = reader.values()
+        self.bids = reader.array()
+
+    def _propositions(self, propositions, goods):
+        """
+        Returns the "propositions" part of the state.
+        """
+        return {
+            "terminated": self.terminated,
+            "sold_prices": list(self.sold_prices),
+            "sold": list(self.sold)
+            }
+
+    def pretty(self):
+        """
+        Returns a string displaying detailed information about the current
+        state of this auction.
+        """
+        string = str(self) + '\n'
+        string += 'Auction is ' + ('still running'
+                                   if not self.is_terminated()
+                                   else 'terminated') + '\n'
+        string += '\n'.join(
+            str(bidder) + ' bought {'
+            + ', '.join(str(good) + f' (€{self.sold_prices[j]})'
+                        for j, good in enumerate(self.goods) if self.trades[i, j]) + '}'
+            + f' for €{self.payments[i]}'
+            for i, bidder in enumerate(self.bidders)
+            ) + '\n'
+        string += 'Unsold goods: {' + \
+            ', '.join(str(good) for j, good in enumerate(self.goods) if not self.sold[j]) + \
+            '}'
+        if not self.is_terminated():
+            string += '\nCurrent bids:\n'
+            string += '\n'.join(
+                str(good) + ' → {'
+                + ', '.join(str(self.bidders[bidder])
+                            for bidder in np.flatnonzero(~np.isnan(self.bids[:, j]))) + '}'
+                for j, good in enumerate(self.goods)
+                if not self.sold[j])
+        return string
+
+    def __str__(self):
+        return f'{self.name} <[{", ".join(str(bidder) for bidder in self.bidders)}], ' + \
+            f'[{", ".join(str(good) for good in self.goods)}]>'
@@ -0,0 +1,523 @@
+import numpy as np
+import pulp
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+from scipy.sparse import csr_matrix, vstack
+
+
+class WDP:
+    """
+This class represents a winner determination problem as a mixed integer
+linear program stored in sparse matrices:
+    maximize c·x
+    subject to row_lb ≤ A·x ≤ row_ub and var_lb ≤ x ≤ var_ub,
+where some variables must be integral. The program is built incrementally,
+by blocks of variables (`add_variables`) and of rows (`add_rows`), then
+solved either in-process (`solve_highs`) or through PuLP (`solve_pulp`).
+Its linear relaxation can be solved as well (`solve_lp`).
+    """
+    def __init__(self) -> None:
+        self.nb_variables = 0
+        self.nb_rows = 0
+        # Lists of blocks (NumPy arrays), concatenated when the program is solved
+        self.c = []
+        self.var_lb = []
+        self.var_ub = []
+        self.integrality = []
+        self.rows = []
+        self.cols = []
+        self.coefs = []
+        self.row_lb = []
+        self.row_ub = []
+
+    def add_variables(self, count: int, lb=-np.inf, ub=np.inf, integral: bool = False, cost=0) -> int:
+        """
+        Adds count variables. Their bounds and objective coefficients can be
+        given either as scalars or as vectors. Returns the index of the first
+        one.
+        """
+        first = self.nb_variables
+        self.c.append(np.broadcast_to(np.asarray(cost, dtype=float), (count,)))
+        self.var_lb.append(np.broadcast_to(np.asarray(lb, dtype=float), (count,)))
+        self.var_ub.append(np.broadcast_to(np.asarray(ub, dtype=float), (count,)))
+        self.integrality.append(np.full(count, int(integral)))
+        self.nb_variables += count
+        return first
+
+    def add_rows(self, count: int, rows, cols, coefs, lb=-np.inf, ub=np.inf) -> int:
+        """
+        Adds count constraints lb ≤ A'·x ≤ ub at once, where A' is given in
+        coordinate format: rows (numbered from 0 within the new block), cols
+        (variable indices) and coefs. lb and ub are scalars or vectors.
+        Returns the index of the first row.
+        """
+        first = self.nb_rows
+        self.rows.append(np.asarray(rows, dtype=np.int64) + first)
+        self.cols.append(np.asarray(cols, dtype=np.int64))
+        self.coefs.append(np.asarray(coefs, dtype=float))
+        self.row_lb.append(np.broadcast_to(np.asarray(lb, dtype=float), (count,)))
+        self.row_ub.append(np.broadcast_to(np.asarray(ub, dtype=float), (count,)))
+        self.nb_rows += count
+        return first
+
+    def add_row(self, variables, coefs, lb=-np.inf, ub=np.inf) -> int:
+        """
+        Adds the constraint lb ≤ Σ coefs[k]·x[variables[k]] ≤ ub.
+        Returns the index of the row.
+        """
+        return self.add_rows(1, np.zeros(len(variables)), variables, coefs, lb, ub)
+
+    def matrix(self) -> csr_matrix:
+        """
+        Returns the constraint matrix A.
+        """
+        return csr_matrix((np.concatenate(self.coefs or [[]]),
+                           (np.concatenate(self.rows or [[]]), np.concatenate(self.cols or [[]]))),
+                          shape=(self.nb_rows, self.nb_variables))
+
+    def vectors(self):
+        """
+        Returns the objective, variable bounds, integrality and row bounds
+        vectors.
+        """
+        def concatenate(blocks, dtype=float):
+            return np.concatenate(blocks) if blocks else np.zeros(0, dtype=dtype)
+        return concatenate(self.c), concatenate(self.var_lb), concatenate(self.var_ub), \
+            concatenate(self.integrality, int), concatenate(self.row_lb), concatenate(self.row_ub)
+
+    def solve_highs(self, time_limit: float = None, mip_gap: float = None):
+        """
+        Solves the program with HiGHS (through `scipy.optimize.milp`), within
+        the given time limit (in seconds) and relative MIP gap, if any.
+        Returns the values of the variables in the best solution found (None
+        if no solution was found), whether this solution is optimal, and an
+        upper bound on the optimal objective value.
+        """
+        c, var_lb, var_ub, integrality, row_lb, row_ub = self.vectors()
+        options = {}
+        if time_limit is not None:
+            options['time_limit'] = time_limit
+        if mip_gap is not None:
+            options['mip_rel_gap'] = mip_gap
+        result = milp(-c,
+                      integrality=integrality,
+                      bounds=Bounds(var_lb, var_ub),
+                      constraints=LinearConstraint(self.matrix(), row_lb, row_ub)
+                      if self.nb_rows else None,
+                      options=options)
+        # Status 1 means that the time limit was reached
+        assert result.status in (0, 1),\
+            "The solver was not able to solve the WDP problem..."
+        optimal = result.status == 0 and (mip_gap is None or (result.get('mip_gap') or 0) <= 1e-4)
+        if result.get('mip_dual_bound') is not None and np.isfinite(result.mip_dual_bound):
+            bound = -result.mip_dual_bound
+        else:
+            bound = c @ result.x if optimal else np.inf
+        return result.x, optimal, bound
+
+    def solve_lp(self, time_limit: float = None):
+        """
+        Solves the linear relaxation of the program with HiGHS (through
+        `scipy.optimize.linprog`), within the given time limit (in seconds)
+        if any. Returns the values of the variables (None if the limit was
+        reached), the optimal objective value, which is an upper bound on
+        the one of the program (infinite if the limit was reached), and the
+        shadow prices of the rows, i.e. the derivatives of the optimal
+        value with respect to their bounds.
+        """
+        c, var_lb, var_ub, _, row_lb, row_ub = self.vectors()
+        matrix = self.matrix()
+        equal = row_lb == row_ub
+        upper = np.flatnonzero(~equal & np.isfinite(row_ub))
+        lower = np.flatnonzero(~equal & np.isfinite(row_lb))
+        equal = np.flatnonzero(equal)
+        inequalities = vstack([matrix[upper], -matrix[lower]]) if len(upper) + len(lower) else None
+        result = linprog(-c,
+                         A_ub=inequalities,
+                         b_ub=np.concatenate([row_ub[upper], -row_lb[lower]]) if inequalities is not None else None,
+                         A_eq=matrix[equal] if len(equal) else None,
+                         b_eq=row_lb[equal] if len(equal) else None,
+                         bounds=np.column_stack([var_lb, var_ub]),
+                         method='highs',
+                         options={} if time_limit is None else {'time_limit': time_limit})
+        # Status 1 means that the time limit was reached
+        assert result.status in (0, 1),\
+            "The solver was not able to solve the relaxation of the WDP problem..."
+        prices = np.zeros(self.nb_rows)
+        if result.status != 0:
+            return None, np.inf, prices
+        # The marginals are those of the minimization of -c·x
+        if inequalities is not None:
+            prices[upper] -= result.ineqlin.marginals[:len(upper)]
+            prices[lower] += result.ineqlin.marginals[len(upper):]
+        if len(equal):
+            prices[equal] -= result.eqlin.marginals
+        return result.x, -result.fun, prices
+
+    def to_pulp(self, name: str = "Winner_Determination", start: np.ndarray = None):
+        """
+        Returns the program as a new PuLP problem of the given name, with the
+        list of its variables, initialized with start if given.
+        """
+        c, var_lb, var_ub, integrality, row_lb, row_ub = self.vectors()
+        prob = pulp.LpProblem(name, pulp.LpMaximize)
+        x = [pulp.LpVariable(f"x_{k}",
+                             None if np.isinf(var_lb[k]) else var_lb[k].item(),
+                             None if np.isinf(var_ub[k]) else var_ub[k].item(),
+                             pulp.LpInteger if integrality[k] else pulp.LpContinuous)
+             for k in range(self.nb_variables)]
+        prob += pulp.LpAffineExpression([(x[k], c[k].item()) for k in np.flatnonzero(c).tolist()])
+        if start is not None:
+            for var, value in zip(x, start.tolist()):
+                var.setInitialValue(value)
+        matrix = self.matrix()
+        for r in range(self.nb_rows):
+            start, end = matrix.indptr[r], matrix.indptr[r + 1]
+            expression = pulp.LpAffineExpression(
+                [(x[k], coef) for k, coef in zip(matrix.indices[start:end].tolist(),
+                                                 matrix.data[start:end].tolist())])
+            if row_lb[r] == row_ub[r]:
+                prob += (expression == row_lb[r].item())
+            else:
+                if not np.isinf(row_lb[r]):
+                    prob += (expression >= row_lb[r].item())
+                if not np.isinf(row_ub[r]):
+                    prob += (expression <= row_ub[r].item())
+        return prob, x
+
+    def export(self, path: str, name: str = "Winner_Determination") -> None:
+        """
+        Writes the program to the given file, in the LP format if its
+        extension is .lp, and in the (free) MPS format otherwise.
+        """
+        prob, _ = self.to_pulp(name)
+        if path.lower().endswith('.lp'):
+            prob.writeLP(path)
+        else:
+            prob.writeMPS(path)
+
+    def solve_pulp(self, solver, name: str = "Winner_Determination", start: np.ndarray = None):
+        """
+        Solves the program with the given PuLP solver (e.g. GLPK or CPLEX),
+        whose time and gap limits, if any, must be set by the caller.
+        The PuLP problem and its variables are created for this solve only
+        (see `to_pulp`); name is the name of the problem, which is also used
+        to name the files kept by the solver. start is an optional initial
+        solution, used by the solvers built with warmStart=True (e.g. CPLEX
+        or CBC).
+        Returns the same triple as `solve_highs`, except that the bound is
+        only known (finite) if the solution is optimal.
+        """
+        c = self.vectors()[0]
+        prob, x = self.to_pulp(name, start)
+        prob.solve(solver)
+        # The status is "not solved" if a limit was reached
+        assert prob.status in (pulp.LpStatusOptimal, pulp.LpStatusNotSolved),\
+            "The solver was not able to solve the WDP problem..."
+        if prob.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            return None, False, np.inf
+        x = np.array([var.varValue or 0 for var in x], dtype=float)
+        optimal = prob.status == pulp.LpStatusOptimal and prob.sol_status == pulp.LpSolutionOptimal
+        return x, optimal, c @ x if optimal else np.inf
+
+
+class ExchangeWDP(WDP):
+    """
+This class represents the winner determination problem of a combinatorial
+exchange (see `core.ce.CombinatorialExchange`), described on page 27 of the
+JAAMAS'21 paper by Mittelman et al. It is assembled in a vectorized way from
+the initial allocation and the flattened bid trees of the bidders (see
+`core.ce.CompiledBids`).
+The variables are the trades of the bidders, the satisfaction of every bid
+tree node and, in the dense formulation, the utility of every bidder.
+In the dense formulation, there is a trade variable for every bidder and
+every good, and one row per bidder and good for each of the C1 and R2
+constraints. In the sparse one, there is only a trade variable (and an R2
+row) for the goods appearing in the leaves of each bidder's tree, the C1
+constraints are variable bounds, and the other trades are fixed to 0 (which
+does not change the optimal welfare), so that the size of the program only
+depends on the size of the bid trees.
+Besides the exact solvers, the program can be solved by heuristics
+(`solve_heuristic`), with a gap to the bound of its linear relaxation.
+    """
+    def __init__(self, allocation, tree, sparse: bool = False) -> None:
+        super().__init__()
+        self.n, self.m = allocation.shape
+        self.allocation = allocation
+        self.tree = tree
+        # Node lists of the bid trees, built by the heuristics only
+        self._node_lists = None
+        n, m, nb_nodes = self.n, self.m, len(tree.parent)
+        leaves = np.flatnonzero(tree.good >= 0)
+        leaf_cells = tree.bidder[leaves] * m + tree.good[leaves]
+        if sparse:
+            # (bidder, good) cells that can be traded, numbered row-major
+            self.cells, leaf_rows = np.unique(leaf_cells, return_inverse=True)
+            # No agent sells more items than she initially holds (C1)
+            self.trade = self.add_variables(len(self.cells), lb=-allocation.ravel()[self.cells],
+                                            integral=True)
+            self.utility = None
+            self.sat = self.add_variables(nb_nodes, 0, 1, integral=True, cost=tree.value)
+        else:
+            self.cells, leaf_rows = np.arange(n * m), leaf_cells
+            self.trade = self.add_variables(n * m, integral=True)
+            self.utility = self.add_variables(n, cost=1)
+            self.sat = self.add_variables(nb_nodes, 0, 1, integral=True)
+        trades = self.trade + np.arange(len(self.cells))
+        sats = self.sat + np.arange(nb_nodes)
+
+        if not sparse:
+            # No agent sells more items than she initially holds (C1)
+            self.add_rows(n * m, np.arange(n * m), trades, np.ones(n * m), lb=-allocation.ravel())
+        # Free disposal is allowed but not to create goods from scratch (C2)
+        self.supply_goods, good_rows = np.unique(self.cells % m, return_inverse=True)
+        self.supply = self.add_rows(len(self.supply_goods), good_rows, trades, np.ones(len(self.cells)), ub=0)
+
+        # Satisfaction of the bid trees (C3)
+        # First, the R1 constraints for any ic node
+        ic = np.flatnonzero(tree.good < 0)
+        ic_rows = np.full(nb_nodes, -1)
+        ic_rows[ic] = np.arange(len(ic))
+        children = np.flatnonzero(tree.parent >= 0)
+        rows = np.concatenate([ic_rows[tree.parent[children]], ic_rows[ic]])
+        cols = np.concatenate([sats[children], sats[ic]])
+        ones = np.ones(len(children))
+        self.add_rows(len(ic), rows, cols, np.concatenate([ones, -tree.ub[ic]]), ub=0)
+        self.add_rows(len(ic), rows, cols, np.concatenate([ones, -tree.lb[ic]]), lb=0)
+        # Second, the R2 constraints for any leaf node. In the dense
+        # formulation, for goods that do not appear in a bid tree, they
+        # ensure that the agent does not sell them.
+        self.add_rows(len(self.cells),
+                      np.concatenate([leaf_rows, np.arange(len(self.cells))]),
+                      np.concatenate([sats[leaves], trades]),
+                      np.concatenate([tree.quantity[leaves], -np.ones(len(self.cells))]),
+                      ub=0)
+
+        # Constraint C4 is implicit
+
+        if not sparse:
+            # Individual utilities (bidders without bids get 0)
+            self.add_rows(n,
+                          np.concatenate([tree.bidder, np.arange(n)]),
+                          np.concatenate([sats, self.utility + np.arange(n)]),
+                          np.concatenate([tree.value, -np.ones(n)]),
+                          lb=0, ub=0)
+
+    def solve_heuristic(self, engine: str, time_limit: float = None):
+        """
+        Solves the program approximately, for exchanges too large to be
+        solved exactly: the linear relaxation is solved first (see
+        `solve_lp`), then candidate satisfactions of the bid trees are built
+        from it, and each of them is turned into a feasible solution (see
+        `_allocate`). With the 'LP_ROUNDING' engine, the candidates are the
+        relaxed satisfactions rounded from the roots down, at several
+        thresholds. With the 'GREEDY' engine, they are the best satisfactions
+        of the trees when the goods are paid at (a multiple of) their prices,
+        i.e. the shadow prices of the C2 rows. Returns the same triple as
+        `solve_highs`, for the best solution found, where the bound is the
+        one of the relaxation, so that the gap of the solution is known; the
+        solution is only deemed optimal if it reaches the bound.
+        """
+        tree = self.tree
+        nb_nodes = len(tree.parent)
+        x, bound, prices = self.solve_lp(time_limit)
+        leaves = np.flatnonzero(tree.good >= 0)
+        if engine == 'LP_ROUNDING':
+            sats = np.zeros(nb_nodes) if x is None else x[self.sat:self.sat + nb_nodes]
+            feasible = np.isfinite(self._subtree_values(np.zeros(nb_nodes), 0, nb_nodes))
+            candidates = [(self._select(sats, feasible, threshold, 0, nb_nodes), tree.value)
+                          for threshold in (0.5 - 1e-6, 1e-6, 0.25, 0.75)]
+        elif engine == 'GREEDY':
+            good_prices = np.zeros(self.m)
+            good_prices[self.supply_goods] = prices[self.supply:self.supply + len(self.supply_goods)]
+            candidates = []
+            for factor in (1, 0.5, 2, 0):
+                weights = tree.value.copy()
+                weights[leaves] -= factor * good_prices[tree.good[leaves]] * tree.quantity[leaves]
+                scores = self._subtree_values(weights, 0, nb_nodes)
+                candidates.append((self._select(scores, np.isfinite(scores), 0, 0, nb_nodes), weights))
+        else:
+            raise Exception(f"Unknown WDP engine {engine}")
+        trades, sats = max((self._allocate(sats, weights) for sats, weights in candidates),
+                           key=lambda solution: tree.value @ solution[1])
+        x = self.solution(trades, sats)
+        return x, tree.value @ sats >= bound - 1e-6 * max(abs(bound), 1), bound
+
+    def _nodes(self):
+        """
+        Returns the lists of the children, lower and upper bounds of every
+        node of the bid trees, and whether it is an internal node.
+        """
+        if self._node_lists is None:
+            tree = self.tree
+            children = [[] for _ in tree.parent]
+            for k, parent in enumerate(tree.parent.tolist()):
+                if parent >= 0:
+                    children[parent].append(k)
+            self._node_lists = children, tree.lb.tolist(), tree.ub.tolist(), (tree.good < 0).tolist()
+        return self._node_lists
+
+    def _subtree_values(self, weights, start: int, end: int) -> np.ndarray:
+        """
+        Returns, for the nodes between start and end (the whole trees of some
+        bidders), given by their weights, the best total weight of the
+        satisfied nodes of their subtrees when they are satisfied (-inf if
+        they can never be). The nodes are stored in preorder, so that the
+        children of a node follow it.
+        """
+        children, lbs, ubs, internal = self._nodes()
+        best = np.asarray(weights, dtype=float).tolist()
+        for k in reversed(range(start, end)):
+            if internal[k]:
+                values = sorted((best[child - start] for child in children[k] if best[child - start] > -np.inf),
+                                reverse=True)
+                lb, ub = int(lbs[k]), int(ubs[k])
+                if len(values) < lb or ub < lb:
+                    best[k - start] = -np.inf
+                else:
+                    best[k - start] += sum(values[:lb]) + sum(value for value in values[lb:ub] if value > 0)
+        return np.array(best)
+
+    def _select(self, scores, feasible, threshold: float, start: int, end: int) -> np.ndarray:
+        """
+        Returns a satisfaction of the nodes between start and end (the whole
+        trees of some bidders), given by their scores, built from the roots
+        down: a root is satisfied if its score is greater than the threshold,
+        and a satisfied node satisfies its lb best scored children, then the
+        next ones (up to ub) whose scores are greater than the threshold.
+        Only the feasible nodes (that can be satisfied) are.
+        """
+        children, lbs, ubs, _ = self._nodes()
+        scores, feasible = np.asarray(scores).tolist(), np.asarray(feasible).tolist()
+        sats = [0. for _ in scores]
+        for k, parent in enumerate(self.tree.parent[start:end].tolist(), start):
+            if parent < 0:
+                sats[k - start] = float(feasible[k - start] and scores[k - start] > threshold)
+            if sats[k - start] and children[k]:
+                candidates = sorted((child for child in children[k] if feasible[child - start]),
+                                    key=lambda child: -scores[child - start])
+                for rank, child in enumerate(candidates):
+                    if rank < lbs[k] or (rank < ubs[k] and scores[child - start] > threshold):
+                        sats[child - start] = 1.
+        return np.array(sats)
+
+    def _allocate(self, sats, weights):
+        """
+        Turns the given candidate satisfaction of the bid trees into a
+        feasible solution, where every bidder gets its candidate, another
+        satisfaction of its tree, or nothing. All the bidders first get their
+        candidates, then the buyers of the over-demanded goods give them up,
+        the least valuable per unit first. The others, by decreasing value,
+        then get their best satisfactions with the goods left (see
+        `_best_response`), and the sellers whose goods are not needed are
+        dropped, the most expensive first. Finally, every bidder gets its
+        best satisfaction with the goods left, if it is more valuable.
+        Returns the trade matrix and the satisfaction vector of the solution
+        (nothing is traded if its welfare is negative).
+        """
+        tree, n = self.tree, self.n
+        ptr = tree.ptr.tolist()
+        sats = np.array(sats, dtype=float)
+        leaves = np.flatnonzero(tree.good >= 0)
+        demand = np.zeros((n, self.m))
+        np.add.at(demand, (tree.bidder[leaves], tree.good[leaves]), tree.quantity[leaves] * sats[leaves])
+        # Smallest trades allowed by the candidates (C1 and R2)
+        trades = np.maximum(demand, -self.allocation)
+        values = np.bincount(tree.bidder, weights=tree.value * sats, minlength=n)
+        accepted = (trades < 0).any(axis=1) | (values > 0)
+        balance = trades[accepted].sum(axis=0)
+        while (balance > 1e-9).any():
+            good = balance.argmax()
+            buyers = np.flatnonzero(accepted & (trades[:, good] > 0))
+            i = buyers[np.argmin(values[buyers] / trades[buyers, good])]
+            accepted[i] = False
+            balance -= trades[i]
+        others = np.flatnonzero(~accepted & tree.has_bid())
+        for i in others[np.argsort(-values[others], kind='stable')].tolist():
+            sats[ptr[i]:ptr[i + 1]], trades[i], values[i] = self._best_response(i, weights, -balance)
+            if values[i] > 0 and (balance + trades[i] <= 1e-9).all():
+                accepted[i] = True
+                balance += trades[i]
+        sellers = np.flatnonzero(accepted & (values < 0))
+        for i in sellers[np.argsort(values[sellers], kind='stable')].tolist():
+            if (balance - trades[i] <= 1e-9).all():
+                accepted[i] = False
+                balance -= trades[i]
+        bidders = np.flatnonzero(tree.has_bid())
+        for i in bidders[np.argsort(-values[bidders], kind='stable')].tolist():
+            others = balance - trades[i] if accepted[i] else balance
+            bidder_sats, bidder_trades, value = self._best_response(i, weights, -others)
+            if value > (values[i] if accepted[i] else 0) + 1e-9 and (others + bidder_trades <= 1e-9).all():
+                sats[ptr[i]:ptr[i + 1]], trades[i], values[i] = bidder_sats, bidder_trades, value
+                accepted[i] = True
+                balance = others + bidder_trades
+        if values[accepted].sum() < 0:
+            accepted[:] = False
+        trades[~accepted] = 0
+        return trades, np.where(accepted[tree.bidder], sats, 0.)
+
+    def _best_response(self, i: int, weights, available):
+        """
+        Returns the best satisfaction of the bid tree of the i-th bidder (for
+        the given node weights) that buys no more units of any good than
+        available, with the corresponding trades and value.
+        """
+        tree = self.tree
+        start, end = tree.ptr[i], tree.ptr[i + 1]
+        goods, quantities = tree.good[start:end], tree.quantity[start:end]
+        leaves = goods >= 0
+        # Only the leaves are indexed: a sub-market may have no goods at all
+        unavailable = np.zeros(end - start, dtype=bool)
+        unavailable[leaves] = quantities[leaves] > available[goods[leaves]] + 1e-9
+        local_weights = np.where(unavailable, -np.inf, weights[start:end])
+        scores = self._subtree_values(local_weights, start, end)
+        sats = self._select(scores, np.isfinite(scores), 0, start, end)
+        demand = np.zeros(self.m)
+        np.add.at(demand, goods[leaves], (quantities * sats)[leaves])
+        return sats, np.maximum(demand, -self.allocation[i]), tree.value[start:end] @ sats
+
+    def trivial_solution(self) -> np.ndarray:
+        """
+        Returns the solution where nothing is traded, which is always feasible.
+        """
+        return np.zeros(self.nb_variables)
+
+    def trivial_bound(self) -> float:
+        """
+        Returns an upper bound on the optimal welfare that does not require
+        solving the program: the sum of the positive node values.
+        """
+        return np.maximum(self.tree.value, 0).sum().item()
+
+    def solution(self, trades, sats) -> np.ndarray:
+        """
+        Returns the solution corresponding to the given bidders × goods trade
+        matrix and node satisfaction vector.
+        """
+        x = self.trivial_solution()
+        x[self.trade:self.trade + len(self.cells)] = np.asarray(trades).ravel()[self.cells]
+        x[self.sat:self.sat + len(self.tree.parent)] = sats
+        if self.utility is not None:
+            x[self.utility:self.utility + self.n] = np.bincount(self.tree.bidder, weights=self.tree.value * sats,
+                                                                minlength=self.n)
+        return x
+
+    def trades(self, x) -> np.ndarray:
+        """
+        Returns the bidders × goods trade matrix of the given solution.
+        """
+        trades = np.zeros(self.n * self.m)
+        trades[self.cells] = np.round(x[self.trade:self.trade + len(self.cells)])
+        return trades.reshape(self.n, self.m) + 0.
+
+    def sats(self, x) -> np.ndarray:
+        """
+        Returns the satisfaction (0 or 1) of every node in the given solution.
+        """
+        return np.round(x[self.sat:self.sat + len(self.tree.parent)]) + 0.
+
+    def payments(self, x) -> np.ndarray:
+        """
+        Returns the payment (i.e. the value of the satisfied bid tree nodes)
+        of every bidder in the given solution.
+        """
+        return np.bincount(self.tree.bidder, weights=self.tree.value * self.sats(x), minlength=self.n) + 0.
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+def top_two_prices(prices):
+    """
+    Computes, over a bidders × goods price matrix where NaN means "no bid",
+    the winner, the highest price and the second highest price of every good.
+    Returns three vectors (one entry per good): the winners (-1 if there is
+    no bid), the highest prices and the second highest prices (strictly
+    lower than the highest ones), NaN when undefined.
+    Ties are broken in favour of the lowest bidder index.
+    """
+    prices = np.where(np.isnan(prices), -np.inf, prices)
+    winners = prices.argmax(axis=0)
+    first_prices = prices.max(axis=0, initial=-np.inf)
+    second_prices = np.where(prices < first_prices, prices, -np.inf).max(axis=0, initial=-np.inf)
+    winners[first_prices == -np.inf] = -1
+    first_prices[first_prices == -np.inf] = np.nan
+    second_prices[second_prices == -np.inf] = np.nan
+    return winners, first_prices, second_prices
+
+
+def top_k_prices(prices, k):
+    """
+    Vectorized selection of the k highest prices of each good in a
+    bidders × goods price matrix, where NaN means "no bid". Returns a
+    k × goods matrix sorted by decreasing price (NaN when a good has fewer
+    than k bids). Uses `numpy.partition`, hence runs in linear time.
+    Raises ValueError if k is lower than 1.
+    """
+    if k < 1:
+        raise ValueError(f'k must be at least 1, not {k}')
+    n = prices.shape[0]
+    prices = np.where(np.isnan(prices), -np.inf, prices)
+    if k < n:
+        prices = np.partition(prices, n - k, axis=0)[n - k:]
+    top = -np.sort(-prices, axis=0)
+    top = np.where(top == -np.inf, np.nan, top)
+    if top.shape[0] < k:
+        top = np.vstack([top, np.full((k - top.shape[0],) + top.shape[1:], np.nan)])
+    return top
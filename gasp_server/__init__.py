@@ -11,6 +11,7 @@ import gasp_server.db as db
 from flask import Flask, request, url_for, current_app
 from gasp_server.auction_runner import start_auction, submit_bid, get_state,\
     SUPPORTED_AUCTIONS, UnsupportedAuction
+from gasp_server.solve_jobs import get_job, delete_jobs
 
 
 WITH_TRACES = True
@@ -118,6 +119,10 @@ def create_app(logging_level=logging.WARNING, config='gasp_server.config.DevConf
     @app.route('/<uuid:competition_id>/<agent_id>/bid', methods=['POST'])
     def bid(competition_id, agent_id):
         return send_bid(str(competition_id), agent_id)
+
+    @app.route('/<uuid:competition_id>/jobs/<uuid:job_id>', methods=['GET'])
+    def job(competition_id, job_id):
+        return job_status(str(competition_id), str(job_id))
     
     return app
 
@@ -311,6 +316,7 @@ def competition_list():
 def delete_competition(competition):
     SUPPORTED_AUCTIONS[competition['mechanism']]['delete'](competition)
     competition_id = competition['competition_id']
+    delete_jobs(competition)
     cursor = db.execute_query(
         """
         DELETE FROM CompetitionState
@@ -384,14 +390,25 @@ def send_bid(competition, agent_id):
     bid = content['bid']
     current_app.logger.debug(f'Bid received from {agent_id}: {bid}')
     try:
-        submit_bid(competition, agent_id, bid)
+        job_id = submit_bid(competition, agent_id, bid)
     except Exception as e:
         current_app.logger.warning(e)
         if WITH_TRACES:
             traceback.print_exc()
         return {"message": f"Error: {e}"}
+    if job_id is not None:
+        return {"message": "Bid submitted",
+                "job": "http://" + request.host + url_for("job", competition_id=competition['competition_id'],
+                                                          job_id=job_id)}
     return {"message": "Bid submitted"}
 
+
+def job_status(competition_id, job_id):
+    job = get_job(competition_id, job_id)
+    if job is None:
+        return {"message": "Unknown job id"}, 404
+    return job
+
 @with_valid_competition(with_goods=True, with_agents=True)
 def force_update_state(competition):
     try:
@@ -11,24 +11,26 @@ from flask import current_app
 def load_saa_variables(competition):
     cursor = db.execute_query(
         """
-        SELECT startPrice, increment FROM SAACompetition
+        SELECT startPrice, increment, proxy FROM SAACompetition
         WHERE competitionId = %s""",
         competition["competition_id"])
     row = cursor.fetchone()
     cursor.close()
     competition['start_price'] = row[0]
     competition['increment'] = row[1]
+    competition['proxy'] = row[2]
 
 
 def save_saa_variables(competition):
     cursor = db.execute_query(
         """
         INSERT INTO SAACompetition (
-        competitionId, startPrice, increment
-        ) VALUES (%s, %s, %s)""",
+        competitionId, startPrice, increment, proxy
+        ) VALUES (%s, %s, %s, %s)""",
         competition["competition_id"],
         competition["start_price"],
-        competition["increment"])
+        competition["increment"],
+        competition.get("proxy", False))
     cursor.close()
     db.commit()
 
@@ -46,7 +48,8 @@ def init_saa(competition):
     return SAAuction([Bidder(agent['id']) for agent in competition['agents']],
                      [GoodType(g) for g in competition['goods']],
                      competition['start_price'],
-                     competition['increment'])
+                     competition['increment'],
+                     current_app.config.get('VECTORIZED_AUCTIONS', False))
 
 
 def load_ce_variables(competition):
@@ -104,24 +107,26 @@ def init_ce(competition):
 def load_sda_variables(competition):
     cursor = db.execute_query(
         """
-        SELECT startPrice, increment FROM SDACompetition
+        SELECT startPrice, increment, proxy FROM SDACompetition
         WHERE competitionId = %s""",
         competition["competition_id"])
     row = cursor.fetchone()
     cursor.close()
     competition['start_price'] = row[0]
     competition['increment'] = row[1]
+    competition['proxy'] = row[2]
 
 
 def save_sda_variables(competition):
     cursor = db.execute_query(
         """
         INSERT INTO SDACompetition (
-        competitionId, startPrice, increment
-        ) VALUES (%s, %s, %s)""",
+        competitionId, startPrice, increment, proxy
+        ) VALUES (%s, %s, %s, %s)""",
         competition["competition_id"],
         competition["start_price"],
-        competition["increment"])
+        competition["increment"],
+        competition.get("proxy", False))
     cursor.close()
     db.commit()
 
@@ -139,7 +144,8 @@ def init_sda(competition):
     return SDAuction([Bidder(agent['id']) for agent in competition['agents']],
                      [GoodType(g) for g in competition['goods']],
                      competition['start_price'],
-                     competition['increment'])
+                     competition['increment'],
+                     current_app.config.get('VECTORIZED_AUCTIONS', False))
 
 def load_ssba1_variables(competition):
     cursor = db.execute_query(
@@ -6,8 +6,9 @@ from flask import current_app
 import urllib.request
 import aiohttp
 import json
-import pickle
 import gasp_server.db as db
+import gasp_server.solve_jobs as solve_jobs
+from core.model import Auction
 from gasp_server.auction_persistance import \
     init_saa, load_saa_variables, save_saa_variables, delete_saa_variables, \
     init_ce, load_ce_variables, save_ce_variables, delete_ce_variables, \
@@ -78,7 +79,7 @@ async def _update_auction_manager(competition, session):
             "competition_id": competition['competition_id'],
             "title": competition["title"],
             "description": competition["description"],
-            "auction_state": json.dumps(auction.state()),
+            "auction_state": auction.state_json(),
             "mechanism": competition["mechanism"],
             "goods": competition['goods'],
             "auction_type": competition["auction_type"]
@@ -88,7 +89,7 @@ async def _update_auction_manager(competition, session):
             "competition_id": competition['competition_id'],
             "title": competition["title"],
             "description": competition["description"],
-            "auction_state": json.dumps(auction.state()),
+            "auction_state": auction.state_json(),
             "mechanism": competition["mechanism"],
             "auction_type": competition["auction_type"],
             "goods": competition['goods'],
@@ -227,7 +228,7 @@ async def _send_bid_request(competition, agent, session):
         "message_type": "bid_request",
         "agent_id": agent['id'],
         "competition_id": competition['competition_id'],
-        "auction_state": json.dumps(auction.state())
+        "auction_state": auction.state_json()
         }
     try:
         json_resp = await _send_message(competition, agent, session, json_body,
@@ -248,7 +249,7 @@ async def _send_stop_message(competition, agent, session):
         "message_type": "stop",
         "agent_id": agent['id'],
         "competition_id": competition['competition_id'],
-        "auction_state": json.dumps(auction.state())
+        "auction_state": auction.state_json()
         }
     try:
         json_resp = await _send_message(competition, agent, session, json_body,
@@ -268,7 +269,7 @@ async def _broadcast_messages(competition, send_fonction):
             tasks.append(
                 send_fonction(competition, agent, session)
             )
-        await asyncio.gather(*tasks)
+        return await asyncio.gather(*tasks)
 
 async def _broadcast_updates(competition, send_fonction):
     async with ClientSession(timeout=ClientTimeout(total=competition['response_clock'])) as session:
@@ -282,11 +283,12 @@ async def _broadcast_updates(competition, send_fonction):
 def update_instance(competition, update_function):
     try:
         auction = update_function(get_instance(competition, release_after_read=False))
+        auction.state_json()  # Serializes the state once, before it is stored in the snapshot
         cursor = db.execute_query(
             """
             UPDATE Competition SET currentInstance = %s
             WHERE competitionId = %s""",
-            pickle.dumps(auction), competition["competition_id"]
+            auction.to_snapshot(), competition["competition_id"]
         )
         cursor.close()
     except Exception as e:
@@ -300,6 +302,8 @@ def get_instance(competition, release_after_read=True):
     Loads the latests version of the instance.
     Caution: someone else can possibly be updating it at the same time. If the lock has not
     been acquired before reading, then this is not thread-safe.
+    Raises ValueError if the stored instance is not a snapshot (see `core.model.Auction.to_snapshot`),
+    e.g. a pickle stored by an older version of the server, which cannot be loaded.
     """
     competition_id = competition["competition_id"]
     cursor = db.execute_query(
@@ -312,7 +316,9 @@ def get_instance(competition, release_after_read=True):
     cursor.close()
     if release_after_read:
         db.commit()
-    return pickle.loads(row[0]) if row[0] else None
+    if not row[0]:
+        return None
+    return Auction.from_snapshot(row[0])
 
 
 def get_state(competition, agent, commit=True):
@@ -320,6 +326,8 @@ def get_state(competition, agent, commit=True):
     Loads the latests version of the state.
     Caution: someone else can possibly be updating it at the same time. If the lock has not
     been acquired before reading, then this is not thread-safe.
+    Raises ValueError if the stored instance is not a snapshot (see `core.model.Auction.to_snapshot`),
+    e.g. a pickle stored by an older version of the server, which cannot be loaded.
     """
     competition_id = competition["competition_id"]
     agent_id = agent["id"]
@@ -371,15 +379,79 @@ def update_state(competition, agent, state, commit=True):
         db.commit()
 
 
+def proxy_limits(agent, response, goods):
+    """
+    Returns the maximum price per good ({good: max_price}) registered by a
+    bidder in its start response, under the "proxy" key. It can be given
+    either directly or as a TBBL valuation, in which case the limit for a
+    good is the highest value of the leaves referring to it. Bidders that
+    did not register anything are represented by their valuation.
+    Only the goods of the auction (whose names are given) with numeric
+    prices are kept. A malformed proxy is replaced by the valuation and, if
+    the valuation is malformed as well, the bidder does not bid at all.
+    """
+    def is_price(price):
+        return isinstance(price, (int, float)) and not isinstance(price, bool)
+
+    def leaf_values(node, limits):
+        if not isinstance(node, dict):
+            raise ValueError(f'{node!r} is not a TBBL node')
+        if node.get('node') == 'leaf':
+            good, value = node.get('good'), node.get('value')
+            if isinstance(good, str) and good in goods and is_price(value):
+                limits[good] = max(value, limits.get(good, value))
+        elif node.get('node') == 'ic' and isinstance(node.get('child_nodes'), list):
+            for child in node['child_nodes']:
+                leaf_values(child, limits)
+        else:
+            raise ValueError(f'{node!r} is not a TBBL node')
+        return limits
+
+    def limits(proxy):
+        if not isinstance(proxy, dict):
+            raise ValueError(f'{proxy!r} is neither a dictionary nor a TBBL valuation')
+        if 'node' in proxy:
+            return leaf_values(proxy, {})
+        return {good: price for good, price in proxy.items() if good in goods and is_price(price)}
+
+    goods = set(goods)
+    proxy = response.get('proxy') if isinstance(response, dict) else None
+    if proxy is not None:
+        try:
+            return limits(proxy)
+        except ValueError as e:
+            current_app.logger.warning(f'Invalid proxy of {agent["id"]} ({e}), using its valuation')
+    try:
+        return limits(agent['valuation'])
+    except ValueError as e:
+        current_app.logger.warning(f'Invalid valuation of {agent["id"]} ({e}), the proxy will not bid')
+        return {}
+
+
 def start_auction(competition):
+    def run_proxy(auction):
+        auction.run_proxy(limits)
+        return auction
+
     auction = SUPPORTED_AUCTIONS[competition['mechanism']]['init'](competition)
     update_instance(competition, lambda instance: auction)
     for agent in competition['agents']:
         update_state(competition, agent, 'STARTED')
-    asyncio.run(_broadcast_messages(competition, _send_start_message))
+    responses = asyncio.run(_broadcast_messages(competition, _send_start_message))
+    if competition.get('proxy'):
+        limits = {
+            agent['id']: proxy_limits(agent, response, competition['goods'])
+            for agent, response in zip(competition['agents'], responses)
+        }
+        update_instance(competition, run_proxy)
     request_bids(competition)
 
 def submit_bid(competition, agent_id, bid):
+    """
+    Records the bid of the given bidder and, once every bidder is ready,
+    computes the next state of the auction. Returns the id of the job solving
+    the next state of a combinatorial exchange (see `solve_jobs`), if any.
+    """
     def send_bid(auction):
         is_legal = True
         try:
@@ -400,6 +472,7 @@ def submit_bid(competition, agent_id, bid):
         current_app.logger.debug("After next: " + auction.pretty())
         return auction
 
+    job_id = None
     if get_state(competition, {'id': agent_id}) != 'PREPARING BID':
         state = get_state(competition, {'id': agent_id})
         raise IncorrectState(
@@ -419,8 +492,14 @@ def submit_bid(competition, agent_id, bid):
     finally:
         current_app.logger.debug(f'>>> {get_state(competition, {"id": agent_id}, commit=False)}')
         if check_all_states(competition, 'READY'):
-            update_instance(competition, next_state)
-            request_bids(competition)
+            if competition['mechanism'] == 'CE':
+                # The winner determination may be long: it is solved by a job,
+                # which requests the next bids once it is done
+                job_id = solve_jobs.submit(competition, request_bids)
+            else:
+                update_instance(competition, next_state)
+                request_bids(competition)
+    return job_id
 
 
 def request_bids(competition):
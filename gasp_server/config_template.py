@@ -1,11 +1,29 @@
 import os
+import tempfile
 
 
 class BaseConfig(object):
     DEBUG = False
     TESTING = False
-    SOLVER = 'GLPK'
+    SOLVER = 'GLPK'  # 'GLPK', 'CBC', 'CPLEX', 'HIGHS' (in-process, through scipy) or 'PORTFOLIO'
     CPLEX_PATH = '<complete path>'
+    VECTORIZED_AUCTIONS = False  # Whether the SAA and SDA competitions use the NumPy (vectorized) auctions
+    SPARSE_WDP = False  # Whether the CE WDPs use the sparse formulation (compare with tools/wdp_benchmark.py)
+    WDP_PROCESSES = 1  # Number of processes solving the CE sub-markets (1: in-process, None: all the cores)
+    WDP_TIME_LIMIT = None  # Maximum CE solving time in seconds (None: no limit)
+    WDP_MIP_GAP = None  # Relative gap at which CE solving stops (None: solver default)
+    WDP_ENGINE = 'EXACT'  # 'EXACT', or 'LP_ROUNDING' or 'GREEDY' (heuristics for very large exchanges)
+    WDP_PORTFOLIO = ['GLPK', 'CBC', 'HIGHS']  # Solvers raced by the 'PORTFOLIO' solver (first optimal answer wins)
+    WDP_CACHE_SIZE = 128  # Number of optimal CE sub-market solutions cached in memory (0: none)
+    # Directory of the on-disk cache of these solutions (None: none), which the solve jobs share: each job
+    # runs in a new process, where the in-memory cache starts empty
+    WDP_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'gasp_wdp_cache')
+    WDP_CACHE_DISK_SIZE = 1024  # Maximum number of solutions in the on-disk cache
+    WDP_EXPORT_DIR = None  # Directory where every solved CE WDP is exported, for tools/wdp_benchmark.py (None: none)
+    WDP_EXPORT_FORMAT = 'MPS'  # Format of the exported programs: 'MPS' or 'LP'
+    CE_PAYMENT_RULE = 'BID'  # 'BID' (pay-as-bid), 'VCG' or 'THRESHOLD'
+    CE_SOLVE_WORKERS = 2  # Number of CE winner determinations solved at the same time (per server process)
+    CE_SOLVE_TIMEOUT = 600  # Seconds after which a CE winner determination is killed (None: never)
 
 
 class DevConfig(BaseConfig):
@@ -35,6 +35,15 @@ def init_db(connection):
         connection.commit()
 
 
+@click.command('migrate-db')
+@set_connection
+def migrate_db(connection):
+    with current_app.open_resource('sql/migrate.sql') as f:
+        cursor = connection.cursor()
+        cursor.execute(f.read().decode('utf8'))
+        connection.commit()
+
+
 @set_connection
 def execute_query(*args, commit_after_query=False, **kwargs):
     error = None
@@ -107,6 +116,7 @@ def close_connection(e=None):
 def init_app(app):
     app.teardown_appcontext(close_connection)
     app.cli.add_command(init_db)
+    app.cli.add_command(migrate_db)
 
 
 #import psycopg2
@@ -0,0 +1,196 @@
+"""
+Out-of-process winner determination of the combinatorial exchanges.
+
+When every bidder of a CE competition is ready, the exchange is solved by a
+job, so that no HTTP request waits for the solver (nor holds the lock on the
+competition row): the job runs in a background thread, which solves the
+exchange in a separate process, and applies the result to the competition
+when it completes. At most CE_SOLVE_WORKERS jobs solve at the same time
+(per server process), and a solve lasting more than CE_SOLVE_TIMEOUT seconds
+is killed, in which case the exchange terminates without any trade.
+The progress of a job is updated each time a sub-market of the exchange is
+solved (see `core.ce.CombinatorialExchange.solve`), not during these solves.
+The jobs are stored in the SolveJob table, so that their status can be read
+from any server process.
+"""
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from flask import current_app
+import gasp_server.db as db
+from core.ce import CombinatorialExchange
+
+# Semaphores limiting the number of concurrent solves, by size
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def submit(competition, on_done):
+    """
+    Creates a job solving the current instance of the given CE competition,
+    and starts it. on_done(competition) is called (in an application context)
+    once the result is applied to the competition. Returns the job id.
+    """
+    job_id = str(uuid.uuid4())
+    cursor = db.execute_query(
+        """
+        INSERT INTO SolveJob (jobId, competitionId, status)
+        VALUES (%s, %s, %s)""",
+        job_id, competition['competition_id'], 'PENDING')
+    cursor.close()
+    db.commit()
+    thread = threading.Thread(target=_run, daemon=True,
+                              args=(current_app._get_current_object(), competition, job_id, on_done))
+    thread.start()
+    return job_id
+
+
+def get_job(competition_id, job_id):
+    """
+    Returns the status of the given job of the given competition (None if
+    there is no such job).
+    """
+    cursor = db.execute_query(
+        """
+        SELECT jobId, status, progress, message, submitted, finished
+        FROM SolveJob
+        WHERE competitionId = %s AND jobId = %s""",
+        competition_id, job_id)
+    row = cursor.fetchone()
+    cursor.close()
+    db.commit()
+    if row is None:
+        return None
+    return {
+        "job_id": row[0],
+        "competition_id": competition_id,
+        "status": row[1],
+        "progress": json.loads(row[2]) if row[2] else None,
+        "message": row[3],
+        "submitted": row[4].isoformat() if row[4] else None,
+        "finished": row[5].isoformat() if row[5] else None
+    }
+
+
+def delete_jobs(competition):
+    """
+    Deletes the jobs of the given competition.
+    """
+    cursor = db.execute_query(
+        """
+        DELETE FROM SolveJob
+        WHERE competitionId = %s""",
+        competition['competition_id'])
+    cursor.close()
+
+
+def _update_job(job_id, status=None, progress=None, message=None, finished=False):
+    """
+    Updates the given fields of a job.
+    """
+    cursor = db.execute_query(
+        """
+        UPDATE SolveJob
+        SET status = COALESCE(%s, status), progress = COALESCE(%s, progress),
+            message = COALESCE(%s, message),
+            finished = CASE WHEN %s THEN CURRENT_TIMESTAMP ELSE finished END
+        WHERE jobId = %s""",
+        status, None if progress is None else json.dumps(progress), message, finished, job_id)
+    cursor.close()
+    db.commit()
+
+
+def _run(app, competition, job_id, on_done):
+    """
+    Body of the thread of a job.
+    """
+    # Imported here, since auction_runner imports this module
+    from gasp_server.auction_runner import get_instance, update_instance
+    with app.app_context():
+        try:
+            size = app.config.get('CE_SOLVE_WORKERS') or 1
+            with _slots_lock:
+                slots = _slots.setdefault(size, threading.BoundedSemaphore(size))
+            with slots:
+                _update_job(job_id, status='RUNNING')
+                status, result = _solve(get_instance(competition), job_id, competition,
+                                        app.config.get('CE_SOLVE_TIMEOUT'))
+            if status == 'DONE':
+                update_instance(competition, lambda auction: result)
+                _update_job(job_id, status=status, finished=True)
+            else:
+                app.logger.warning(f'Winner determination of {competition["competition_id"]} failed '
+                                   f'({status}): {result}. Terminating the exchange without any trade.')
+
+                def abort(auction):
+                    auction.abort()
+                    return auction
+                update_instance(competition, abort)
+                _update_job(job_id, status=status, message=result, finished=True)
+            on_done(competition)
+        except Exception as e:
+            app.logger.exception(e)
+            _update_job(job_id, status='FAILED', message=repr(e), finished=True)
+
+
+def _solve(auction, job_id, competition, timeout):
+    """
+    Solves the given exchange in a separate process, killed after timeout
+    seconds (if not None). Returns ('DONE', solved exchange), or
+    ('TIMEOUT' or 'FAILED', error message).
+    """
+    # A new interpreter, rather than a fork of this multi-threaded server
+    # (with its database connections)
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_solve_worker, args=(auction.to_snapshot(), sender))
+    process.start()
+    sender.close()
+    deadline = None if timeout is None else time.time() + timeout
+    try:
+        while True:
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and (remaining <= 0 or not receiver.poll(remaining)):
+                return 'TIMEOUT', f'No result after {timeout} seconds'
+            kind, payload = receiver.recv()
+            if kind == 'progress':
+                current_app.logger.info(f'Winner determination of {competition["competition_id"]}: {payload}')
+                _update_job(job_id, progress=payload)
+            elif kind == 'done':
+                return 'DONE', CombinatorialExchange.from_snapshot(payload)
+            else:
+                return 'FAILED', payload
+    except EOFError:
+        return 'FAILED', f'The solver process died (exit code {process.exitcode})'
+    finally:
+        if process.is_alive():
+            try:
+                # Kill the process group, so that command-line solvers die as well
+                os.killpg(process.pid, signal.SIGKILL)
+            except (AttributeError, OSError):
+                process.kill()
+        process.join()
+        receiver.close()
+
+
+def _solve_worker(instance, connection):
+    """
+    Body of a solver process: solves the given exchange (a snapshot), sending
+    its progress, then the snapshot of the solved exchange (or the error) through
+    the given connection. The process has its own process group, so that it
+    can be killed along with the solvers it runs.
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    try:
+        auction = CombinatorialExchange.from_snapshot(instance)
+        auction.next(on_progress=lambda progress: connection.send(('progress', progress)))
+        connection.send(('done', auction.to_snapshot()))
+    except Exception as e:
+        connection.send(('error', repr(e)))
+    finally:
+        connection.close()
@@ -0,0 +1,5 @@
+-- Upgrades a database created with an older schema.sql, without losing its
+-- data (every statement can be run again safely)
+
+ALTER TABLE SAACompetition ADD COLUMN IF NOT EXISTS proxy BOOLEAN DEFAULT FALSE;
+ALTER TABLE SDACompetition ADD COLUMN IF NOT EXISTS proxy BOOLEAN DEFAULT FALSE;
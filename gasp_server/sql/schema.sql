@@ -1,4 +1,5 @@
 DROP TABLE IF EXISTS InitialCEAllocation;
+DROP TABLE IF EXISTS SolveJob;
 -- DROP TABLE IF EXISTS CECompetition;
 DROP TABLE IF EXISTS CompetitionState CASCADE;
 DROP TABLE IF EXISTS Agent CASCADE;
@@ -25,6 +26,7 @@ CREATE TABLE SAACompetition (
        competitionId VARCHAR(40) PRIMARY KEY,
        startPrice INT,
        increment INT,
+       proxy BOOLEAN DEFAULT FALSE,
        FOREIGN KEY (competitionId) REFERENCES Competition(competitionId)
 );
 
@@ -32,6 +34,7 @@ CREATE TABLE SDACompetition (
        competitionId VARCHAR(40) PRIMARY KEY,
        startPrice INT,
        increment INT,
+       proxy BOOLEAN DEFAULT FALSE,
        FOREIGN KEY (competitionId) REFERENCES Competition(competitionId)
 );
 
@@ -81,6 +84,17 @@ CREATE TABLE CompetitionState (
        FOREIGN KEY (competitionId, agentName) REFERENCES Agent(competitionId, agentName)
 );
 
+CREATE TABLE SolveJob (
+       jobId VARCHAR(40) PRIMARY KEY,
+       competitionId VARCHAR(40),
+       status VARCHAR(20),
+       progress TEXT,
+       message TEXT,
+       submitted TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+       finished TIMESTAMP,
+       FOREIGN KEY (competitionId) REFERENCES Competition(competitionId)
+);
+
 CREATE TABLE InitialCEAllocation (
        competitionId VARCHAR(40),
        goodName VARCHAR(20),
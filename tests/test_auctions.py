@@ -0,0 +1,47 @@
+import json
+import os
+import random
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.model import Bidder, GoodType
+from core.saa import SAAuction
+from core.sda import SDAuction
+
+
+@pytest.mark.parametrize('auction_class, start_price, increment', [(SAAuction, 1, 2), (SDAuction, 30, -3)])
+@pytest.mark.parametrize('seed', range(20))
+def test_vectorized_auction(auction_class, start_price, increment, seed):
+    # The same bids, given through does, apply_bid or apply_bids, lead to the
+    # same states whether the auction is vectorized or not
+    rng = random.Random(seed)
+    bidders = [Bidder(f'b{i}') for i in range(rng.randint(1, 5))]
+    goods = [GoodType(f'g{j}') for j in range(rng.randint(1, 5))]
+    auctions = [auction_class(bidders, goods, start_price, increment, vectorized=vectorized)
+                for vectorized in (False, True)]
+    for _ in range(30):
+        bids = [(i, [j for j in range(len(goods)) if rng.random() < .4]) for i in range(len(bidders))]
+        way = rng.choice(['does', 'apply_bid', 'apply_bids'])
+        legal = []
+        for auction in auctions:
+            if way == 'does':
+                actions = [(bidders[i], [goods[j] for j in bid]) for i, bid in bids]
+                legal.append([auction.is_legal(action) for action in actions])
+                for action, is_legal in zip(actions, legal[-1]):
+                    if is_legal:
+                        auction.does(*action)
+            elif way == 'apply_bid':
+                legal.append([auction.apply_bid(i, np.array(bid, dtype=np.int64)) for i, bid in bids])
+            else:
+                mask = np.zeros((len(bidders), len(goods)), dtype=bool)
+                for i, bid in bids:
+                    mask[i, bid] = True
+                legal.append(auction.apply_bids(np.arange(len(bidders)), mask).tolist())
+            auction.next()
+        assert legal[0] == legal[1]
+        assert json.loads(auctions[0].state_json()) == json.loads(auctions[1].state_json())
+        assert auctions[0].is_terminated() == auctions[1].is_terminated()
+    assert auctions[0].trades.toarray().tolist() == auctions[1].trades.toarray().tolist()
+    assert auctions[0].payments.tolist() == auctions[1].payments.tolist()
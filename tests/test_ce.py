@@ -0,0 +1,50 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.model import Bidder, GoodType
+from core.ce import CombinatorialExchange, IntervalChoose, Leaf
+
+
+@pytest.mark.parametrize('engine', ['EXACT', 'LP_ROUNDING', 'GREEDY'])
+def test_sub_market_without_goods(engine):
+    # Normalization drops the only leaf (worth nothing), leaving a bidder whose
+    # sub-market has no goods at all
+    good = GoodType('g')
+    exchange = CombinatorialExchange([Bidder('x'), Bidder('y')], [good], [[1], [0]],
+                                     {'SOLVER': 'HIGHS', 'WDP_ENGINE': engine})
+    exchange.does('x', IntervalChoose(0, 1, 5, [Leaf(1, good, 0)]))
+    exchange.next()
+    state = exchange.state()
+    assert state['joint_trade'] == {'x': {}, 'y': {}}
+    assert state['joint_payment'] == {'x': 5.0}
+
+
+@pytest.mark.parametrize('solver', ['HIGHS', 'CBC'])
+def test_warm_start_after_revision(solver):
+    # Once the buyer revises its bid, the last solution leaves the seller with
+    # its cost only: the next solve must not start from it
+    good = GoodType('g')
+    bidders = [Bidder('seller'), Bidder('buyer')]
+    bids = {'seller': IntervalChoose(1, 1, 0, [Leaf(-1, good, -3)]),
+            'buyer': IntervalChoose(1, 1, 0, [Leaf(1, good, 10)])}
+    exchange = CombinatorialExchange(bidders, [good], [[1], [0]], {'SOLVER': solver})
+    for bidder, bid in bids.items():
+        exchange.does(bidder, bid)
+    exchange.solve()
+    assert exchange.state()['joint_trade'] == {'seller': {'g': -1}, 'buyer': {'g': 1}}
+    bids['buyer'] = IntervalChoose(1, 1, 0, [Leaf(1, good, 1)])
+    exchange.does('buyer', bids['buyer'])
+    starts = []
+    start = exchange._start
+    exchange._start = lambda *args: starts.append(start(*args)) or starts[-1]
+    exchange.solve()
+    assert starts == [None]
+    cold = CombinatorialExchange(bidders, [good], [[1], [0]], {'SOLVER': solver})
+    for bidder, bid in bids.items():
+        cold.does(bidder, bid)
+    cold.solve()
+    assert exchange.state() == cold.state()
+    assert exchange.state()['joint_trade'] == {'seller': {}, 'buyer': {}}
+    assert exchange.optimal
@@ -0,0 +1,15 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.model import SparseTrades
+
+
+def test_sparse_trades_array_reads():
+    dense = np.array([[0, 2, 0], [-1, 0, 3]])
+    trades = SparseTrades.from_array(dense)
+    assert trades[1, 2] == 3 and trades[np.int64(0), np.int64(0)] == 0
+    assert trades[np.array([0, 1, 1]), np.array([1, 0, 1])].tolist() == [2, -1, 0]
+    assert trades[1, np.arange(3)].tolist() == dense[1].tolist()
+    assert trades[np.arange(2)[:, None], np.arange(3)].tolist() == dense.tolist()
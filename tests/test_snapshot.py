@@ -0,0 +1,31 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.model import Auction, Bidder, GoodType
+from core.saa import SAAuction
+
+
+def auction(vectorized):
+    a = SAAuction([Bidder('a'), Bidder('b')], [GoodType('x'), GoodType('y')], 1, 1, vectorized=vectorized)
+    a.does('a', ['x'])
+    a.next()
+    return a
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('compress', [False, True])
+def test_truncated_snapshot(vectorized, compress):
+    data = auction(vectorized).to_snapshot(compress)
+    for size in range(len(data)):
+        with pytest.raises(ValueError):
+            Auction.from_snapshot(data[:size])
+
+
+def test_corrupt_snapshot():
+    data = auction(True).to_snapshot()
+    with pytest.raises(ValueError):
+        Auction.from_snapshot(data[:len(data) // 2] + bytes(len(data) - len(data) // 2))
+    with pytest.raises(ValueError):
+        Auction.from_snapshot(b'not a snapshot')
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+"""
+Replays a corpus of combinatorial exchange WDPs, exported by the server when
+WDP_EXPORT_DIR is set (see `core.ce.export_wdp`), against several solvers
+and both formulations of the program, and prints the build time, solve time
+and peak memory of every run as a table, followed by totals per solver and
+formulation.
+Every run takes place in a fresh process, so that its peak memory is its own:
+the increase of the peak resident size of the process during the build and
+solve (over that of the interpreter and the loaded instance), and the peak
+resident size of the command-line solver it runs, if any.
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import os.path
+import resource
+import sys
+import time
+import traceback
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from core.ce import load_wdp, solve_exchange_wdp
+from core.wdp import ExchangeWDP
+
+FORMULATIONS = {'dense': False, 'sparse': True}
+HEURISTICS = ('LP_ROUNDING', 'GREEDY')
+
+
+def run(path, solver, formulation, time_limit, cplex_path):
+    """
+    Builds and solves the WDP of the given .npz file. Returns a dictionary
+    describing the run.
+    """
+    result = {"instance": os.path.splitext(os.path.basename(path))[0], "solver": solver,
+              "formulation": formulation}
+    # Kilobytes on Linux
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        allocation, tree = load_wdp(path)
+        base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        config = {'SOLVER': 'HIGHS' if solver in HEURISTICS else solver, 'CPLEX_PATH': cplex_path,
+                  'WDP_ENGINE': solver if solver in HEURISTICS else 'EXACT'}
+        build_start = time.time()
+        wdp = ExchangeWDP(allocation, tree, FORMULATIONS[formulation])
+        solve_start = time.time()
+        x, optimal, _ = solve_exchange_wdp(wdp, config, f'bench_{os.getpid()}', time_limit)
+        solve_end = time.time()
+        result.update({
+            "bidders": wdp.n,
+            "nodes": len(tree.parent),
+            "variables": wdp.nb_variables,
+            "rows": wdp.nb_rows,
+            "build_time": solve_start - build_start,
+            "solve_time": solve_end - solve_start,
+            "status": 'optimal' if optimal else 'feasible' if x is not None else 'no solution',
+            "welfare": None if x is None else (wdp.vectors()[0] @ x).item()
+        })
+    except Exception:
+        result["status"] = 'failed'
+        result["error"] = traceback.format_exc(limit=1)
+    result["memory"] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024
+    solver_memory = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    result["solver_memory"] = solver_memory / 1024 if solver_memory else None
+    return result
+
+
+def table(rows, columns):
+    """
+    Formats the given rows (dictionaries) as a fixed-width table of the given
+    (title, key, format) columns.
+    """
+    cells = [[title for title, _, _ in columns]] + \
+        [['-' if row.get(key) is None else format.format(row[key]) for _, key, format in columns]
+         for row in rows]
+    widths = [max(len(line[k]) for line in cells) for k in range(len(columns))]
+    lines = ['  '.join(cell.rjust(width) for cell, width in zip(line, widths)) for line in cells]
+    lines.insert(1, '  '.join('-' * width for width in widths))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the WDP solvers on an exported corpus.')
+    parser.add_argument('corpus', help='directory of the exported WDPs (WDP_EXPORT_DIR)')
+    parser.add_argument('--solvers', default='HIGHS,GLPK,CBC',
+                        help='comma-separated solvers: HIGHS, GLPK, CBC, CPLEX, LP_ROUNDING or GREEDY '
+                             '(default: HIGHS,GLPK,CBC)')
+    parser.add_argument('--formulations', default='dense,sparse',
+                        help='comma-separated formulations: dense and/or sparse (default: both)')
+    parser.add_argument('--time-limit', type=float, default=60, help='time limit of a solve, in seconds')
+    parser.add_argument('--cplex-path', default=None, help='path of the CPLEX executable')
+    parser.add_argument('--processes', type=int, default=1, help='number of runs at the same time')
+    parser.add_argument('--json', default=None, help='file where the runs are also written as JSON')
+    args = parser.parse_args()
+    paths = sorted(glob.glob(os.path.join(args.corpus, '*.npz')))
+    if not paths:
+        sys.stderr.write(f'No exported WDP in {args.corpus}\n')
+        sys.exit(1)
+    solvers = [solver.strip().upper() for solver in args.solvers.split(',')]
+    formulations = [formulation.strip().lower() for formulation in args.formulations.split(',')]
+    for formulation in formulations:
+        if formulation not in FORMULATIONS:
+            parser.error(f'unknown formulation {formulation}')
+    runs = [(path, solver, formulation, args.time_limit, args.cplex_path)
+            for path in paths for solver in solvers for formulation in formulations]
+    with multiprocessing.get_context('spawn').Pool(args.processes, maxtasksperchild=1) as pool:
+        results = pool.starmap(run, runs, chunksize=1)
+    print(table(results, [('Instance', 'instance', '{}'), ('Bidders', 'bidders', '{}'),
+                          ('Nodes', 'nodes', '{}'), ('Solver', 'solver', '{}'),
+                          ('Form.', 'formulation', '{}'), ('Vars', 'variables', '{}'),
+                          ('Rows', 'rows', '{}'), ('Build (s)', 'build_time', '{:.3f}'),
+                          ('Solve (s)', 'solve_time', '{:.3f}'), ('Memory (MB)', 'memory', '{:.1f}'),
+                          ('Solver memory (MB)', 'solver_memory', '{:.1f}'),
+                          ('Status', 'status', '{}'), ('Welfare', 'welfare', '{:g}')]))
+    totals = []
+    for solver in solvers:
+        for formulation in formulations:
+            group = [result for result in results
+                     if result['solver'] == solver and result['formulation'] == formulation]
+            totals.append({
+                "solver": solver,
+                "formulation": formulation,
+                "optimal": sum(result['status'] == 'optimal' for result in group),
+                "failed": sum(result['status'] == 'failed' for result in group),
+                "build_time": sum(result.get('build_time') or 0 for result in group),
+                "solve_time": sum(result.get('solve_time') or 0 for result in group),
+                "memory": max(result['memory'] for result in group),
+                "solver_memory": max((result['solver_memory'] for result in group
+                                      if result['solver_memory'] is not None), default=None)
+            })
+    print()
+    print(table(totals, [('Solver', 'solver', '{}'), ('Form.', 'formulation', '{}'),
+                         ('Optimal', 'optimal', '{}'), ('Failed', 'failed', '{}'),
+                         ('Build (s)', 'build_time', '{:.3f}'), ('Solve (s)', 'solve_time', '{:.3f}'),
+                         ('Max memory (MB)', 'memory', '{:.1f}'),
+                         ('Max solver memory (MB)', 'solver_memory', '{:.1f}')]))
+    for result in results:
+        if result['status'] == 'failed':
+            sys.stderr.write(f'{result["instance"]} ({result["solver"]}, {result["formulation"]}): '
+                             f'{result["error"]}')
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)